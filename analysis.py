@@ -0,0 +1,184 @@
+from typing import Callable, List, Sequence, Tuple
+import argparse
+import json
+import math
+
+import numpy as np
+
+from cards import Card, NUM_CARDS
+from hypothesis import parse
+from rules import RULES
+from transitions import compile_rule
+
+# score_round gives the prophet bonus when the valid ratio falls in this band
+BONUS_BAND = (0.2, 0.8)
+
+
+def transition_matrix(rule: Callable[[List[Card]], bool]) -> np.ndarray:
+    """(52, 52) boolean matrix of the accepted (previous, current) pairs of a window-2 rule"""
+    table = compile_rule(rule)
+    if table is None:
+        raise ValueError(f"{rule.__name__} is not a window-2 rule")
+    return np.frombuffer(table.table, dtype=np.uint8).reshape(NUM_CARDS, NUM_CARDS).astype(bool)
+
+
+def stationary_acceptance(matrix: np.ndarray, iterations: int = 500) -> Tuple[float, np.ndarray]:
+    """
+    Expected acceptance of a uniformly random card once the mainline has settled:
+    the last mainline card follows the chain prev -> accepted successor, whose
+    stationary distribution is found by power iteration
+    :return: (acceptance rate, stationary distribution of the last mainline card)
+    """
+    successors = matrix.sum(axis=1)
+    step = np.divide(matrix, successors[:, None], out=np.zeros(matrix.shape), where=successors[:, None] > 0)
+    distribution = np.full(NUM_CARDS, 1 / NUM_CARDS)
+    for _ in range(iterations):
+        following = distribution @ step
+        # Cards without successors restart the chain uniformly (the round would be stuck)
+        following += (distribution * (successors == 0)).sum() / NUM_CARDS
+        # Average with the previous step so periodic chains (e.g. alternating colors) converge
+        following = (following + distribution) / 2
+        if np.abs(following - distribution).max() < 1e-12:
+            break
+        distribution = following
+    return float(distribution @ successors / NUM_CARDS), distribution
+
+
+def exact(rule: Callable[[List[Card]], bool]) -> dict:
+    """Exact enumeration over the 52×52 card pairs"""
+    matrix = transition_matrix(rule)
+    successors = matrix.sum(axis=1)
+    growth, _ = stationary_acceptance(matrix)
+    return {
+        "acceptance_rate": float(matrix.mean()),
+        "min_successors": int(successors.min()),
+        "max_successors": int(successors.max()),
+        "stationary_acceptance": growth,
+    }
+
+
+def description_disagreement(rule: Callable[[List[Card]], bool], description: str) -> float:
+    """
+    Fraction of the card pairs on which a rule disagrees with its own description read with the
+    rule DSL (NaN if the description cannot be parsed), e.g. rules comparing a Suit to a string
+    """
+    expression = parse(description)
+    if expression is None:
+        return float("nan")
+    described = np.frombuffer(expression.table(), dtype=np.uint8).reshape(NUM_CARDS, NUM_CARDS).astype(bool)
+    return float((described != transition_matrix(rule)).mean())
+
+
+def distinguishability(rules: Sequence[Callable[[List[Card]], bool]]) -> np.ndarray:
+    """
+    Fraction of the card pairs on which two rules disagree, for every pair of rules:
+    0 means no play can tell them apart
+    """
+    flat = np.stack([transition_matrix(rule).ravel() for rule in rules])
+    return (flat[:, None, :] != flat[None, :, :]).mean(axis=2)
+
+
+def monte_carlo(
+    rule: Callable[[List[Card]], bool],
+    games: int = 10_000,
+    hand_size: int = 7,
+    max_turns: int = 200,
+    seed: int = 0,
+) -> dict:
+    """
+    Vectorized solo rounds of the random policy: deal hand_size cards from a shuffled deck,
+    play a random card from the hand, draw two cards after an invalid play (as play_card does),
+    until the hand is empty, the deck is exhausted or max_turns is reached
+    """
+    matrix = transition_matrix(rule)
+    rng = np.random.default_rng(seed)
+    rows = np.arange(games)
+    decks = np.argsort(rng.random((games, NUM_CARDS)), axis=1)
+    hands = np.zeros((games, NUM_CARDS), dtype=np.int16)
+    np.add.at(hands, (rows[:, None], decks[:, :hand_size]), 1)
+    drawn = np.full(games, hand_size)
+    previous = np.full(games, -1)
+    valid = np.zeros(games, dtype=np.int32)
+    invalid = np.zeros(games, dtype=np.int32)
+    turns = np.zeros(games, dtype=np.int32)
+    active = np.ones(games, dtype=bool)
+
+    for _ in range(max_turns):
+        if not active.any():
+            break
+        sizes = hands.sum(axis=1)
+        pick = (rng.random(games) * np.maximum(sizes, 1)).astype(np.int64)
+        cards = (np.cumsum(hands, axis=1) > pick[:, None]).argmax(axis=1)
+        accepted = np.where(previous < 0, True, matrix[np.maximum(previous, 0), cards]) & active
+        rejected = active & ~accepted
+
+        hands[rows[active], cards[active]] -= 1
+        valid += accepted
+        invalid += rejected
+        turns += active
+        previous = np.where(accepted, cards, previous)
+        for _ in range(2):
+            draw = rejected & (drawn < NUM_CARDS)
+            hands[rows[draw], decks[rows[draw], drawn[draw]]] += 1
+            drawn += draw
+        active &= (hands.sum(axis=1) > 0) & (drawn < NUM_CARDS)
+
+    plays = valid + invalid
+    ratios = valid / np.maximum(plays, 1)
+    low, high = BONUS_BAND
+    return {
+        "games": games,
+        "mean_valid_ratio": float(ratios.mean()),
+        "bonus_rate": float(((ratios >= low) & (ratios <= high)).mean()),
+        "mean_turns": float(turns.mean()),
+        "mainline_growth": float((valid / np.maximum(turns, 1)).mean()),
+    }
+
+
+def selection_weights(report: Sequence[dict]) -> List[float]:
+    """
+    Rule selection weights for rules.get_random_rule: the Monte Carlo probability that a round
+    ends in the bonus band, so rules that are never (or always) accepted are not drawn
+    """
+    return [entry["bonus_rate"] for entry in report]
+
+
+def analyze(games: int = 10_000, seed: int = 0) -> dict:
+    """Exact and Monte Carlo statistics of every rule of RULES, with selection weights"""
+    rules = [rule for rule, _ in RULES]
+    report = []
+    for rule, description in RULES:
+        report.append(dict(rule=description, function=rule.__name__, **exact(rule), **monte_carlo(rule, games, seed=seed),
+                           description_disagreement=description_disagreement(rule, description)))
+    matrix = distinguishability(rules)
+    weights = selection_weights(report)
+    for i, entry in enumerate(report):
+        others = [j for j in range(len(rules)) if j != i]
+        closest = min(others, key=lambda j: matrix[i, j])
+        entry["closest_rule"] = RULES[closest][1]
+        entry["closest_disagreement"] = float(matrix[i, closest])
+        entry["weight"] = weights[i]
+    return {"rules": report, "distinguishability": matrix.round(4).tolist(), "weights": weights}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Difficulty analysis of the Eleusis rules")
+    parser.add_argument("--games", type=int, default=10_000, help="Monte Carlo rounds per rule")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--weights", help="Write the rule selection weights as JSON to this file")
+    args = parser.parse_args()
+
+    result = analyze(args.games, args.seed)
+    for entry in result["rules"]:
+        print(f"{entry['acceptance_rate']:.3f} exact  {entry['stationary_acceptance']:.3f} settled  "
+              f"{entry['mean_valid_ratio']:.3f} valid ratio  {entry['bonus_rate']:.2f} bonus  "
+              f"w={entry['weight']:.2f}  {entry['rule']}")
+        if math.isnan(entry["description_disagreement"]):
+            print("      its description cannot be read with the rule DSL, check it by hand")
+        elif entry["description_disagreement"] > 0:
+            print(f"      differs from its description on {entry['description_disagreement']:.1%} of the card pairs")
+        if entry["closest_disagreement"] == 0:
+            print(f"      indistinguishable from: {entry['closest_rule']}")
+    if args.weights:
+        with open(args.weights, "w") as f:
+            json.dump(result["weights"], f)
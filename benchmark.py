@@ -0,0 +1,226 @@
+from typing import Callable, Dict, List, Optional
+import argparse
+import copy
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+from cards import Card, Deck, Mainline, Shoe, NUM_CARDS
+from eleusis import EleusisGame
+from rules import RULES
+import simulate
+
+# Subprocesses import the repo modules from here, whatever the caller's working directory
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class Case:
+    def __init__(self, name: str, setup: Callable[[], Callable[[], None]], ops: int = 1):
+        """
+        A benchmark case
+        :param setup: Builds the state and returns the function to time
+        :param ops: Number of operations performed by one call of the timed function
+        """
+        self.name = name
+        self.setup = setup
+        self.ops = ops
+
+
+def _deck_case(num_decks: int) -> Case:
+    def setup():
+        rng = random.Random(0)
+        def run():
+            Deck(num_decks).shuffle(rng)
+        return run
+    return Case(f"deck/build_shuffle/{num_decks}_decks", setup)
+
+
+def _shoe_case(num_decks: int) -> Case:
+    def setup():
+        rng = random.Random(0)
+        def run():
+            Shoe(num_decks, rng).draw_many(28)
+        return run
+    return Case(f"deck/shoe_deal/{num_decks}_decks", setup)
+
+
+def _rule_case(rule, description: str, windows: int = 1000) -> Case:
+    def setup():
+        rng = random.Random(0)
+        pairs = [[Card.from_code(rng.randrange(NUM_CARDS)), Card.from_code(rng.randrange(NUM_CARDS))]
+                 for _ in range(windows)]
+        def run():
+            for pair in pairs:
+                rule(pair)
+        return run
+    return Case(f"rules/{rule.__name__}", setup, ops=windows)
+
+
+def _game(mainline_length: int, sidelines: int = 0) -> EleusisGame:
+    game = EleusisGame(1, seed=0, verbose=False)
+    game.setup_round(0)
+    rng = random.Random(0)
+    game.mainline = [Card.from_code(rng.randrange(NUM_CARDS)) for _ in range(mainline_length)]
+    for i in range(sidelines):
+        game.sidelines.append((Card.from_code(rng.randrange(NUM_CARDS)), game.mainline.view(mainline_length * i // sidelines)))
+    return game
+
+
+def _play_card_case(mainline_length: int, plays: int = 100) -> Case:
+    def setup():
+        game = _game(mainline_length)
+        player = game.table.players[0]
+        cards = [Card.from_code(code % NUM_CARDS) for code in range(plays)]
+        game._sync_renderer()
+        renderer = copy.copy(game.renderer)
+        codes = game.mainline.codes[:]
+        def run():
+            # Restart from the same mainline so every run times the same work
+            game.mainline = Mainline.from_codes(codes)
+            game.sidelines.clear()
+            game.history.clear()
+            game.renderer = copy.copy(renderer)
+            game.renderer.sidelines = []
+            for card in cards:
+                player.add_card(card)
+                game.play_card(player, card)
+        return run
+    return Case(f"game/play_card/mainline_{mainline_length}", setup, ops=plays)
+
+
+def _perspective_case(mainline_length: int) -> Case:
+    def setup():
+        game = _game(mainline_length, sidelines=min(mainline_length, 50))
+        player = game.table.players[0]
+        def run():
+            game.get_player_perspective(player)
+        return run
+    return Case(f"game/perspective/mainline_{mainline_length}", setup)
+
+
+def _simulation_case(policy: str, games: int = 20) -> Case:
+    def setup():
+        def run():
+            for i in range(games):
+                simulate.run_game(i % len(RULES), i, policy)
+        return run
+    return Case(f"simulate/games/{policy}", setup, ops=games)
+
+
+def _startup_case(module: str) -> Case:
+    def setup():
+        # A fresh interpreter each time, as paid by every CLI run and spawned worker process
+        command = [sys.executable, "-c", f"import {module}" if module else "pass"]
+        def run():
+            subprocess.run(command, check=True, cwd=ROOT)
+        return run
+    return Case(f"startup/import_{module or 'nothing'}", setup)
+
+
+def import_times(module: str, top: int = 15) -> List[tuple]:
+    """Return the slowest imports of a module as (cumulative µs, self µs, name), from python -X importtime"""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True, cwd=ROOT).stderr
+    times = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            times.append((int(cumulative_us), int(self_us), name.strip()))
+    return sorted(times, reverse=True)[:top]
+
+
+def all_cases(quick: bool = False) -> List[Case]:
+    lengths = (10, 1_000, 10_000) if quick else (10, 1_000, 100_000)
+    decks = (1, 10) if quick else (1, 10, 100)
+    cases = [_deck_case(n) for n in decks] + [_shoe_case(n) for n in decks]
+    cases += [_rule_case(rule, description) for rule, description in RULES]
+    cases += [_play_card_case(n) for n in lengths]
+    cases += [_perspective_case(n) for n in lengths]
+    cases += [_simulation_case(policy) for policy in simulate.POLICIES]
+    cases += [_startup_case(module) for module in ("", "eleusis", "simulate")]
+    return cases
+
+
+def measure(case: Case, repeat: int = 5, min_time: float = 0.05) -> dict:
+    """Time a case, return the best and median seconds per operation"""
+    run = case.setup()
+    run()
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or loops >= 1 << 20:
+            break
+        loops *= 2
+    timings = [elapsed]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(loops):
+            run()
+        timings.append(time.perf_counter() - start)
+    per_op = sorted(t / (loops * case.ops) for t in timings)
+    return {"best": per_op[0], "median": per_op[len(per_op) // 2], "ops": loops * case.ops}
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], threshold: float) -> List[str]:
+    """Return a description of every case slower than baseline * threshold"""
+    regressions = []
+    for name, result in results.items():
+        if name in baseline and result["best"] > baseline[name]["best"] * threshold:
+            ratio = result["best"] / baseline[name]["best"]
+            regressions.append(f"{name}: {ratio:.2f}x slower ({baseline[name]['best']:.3g}s -> {result['best']:.3g}s)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Eleusis engine hot paths")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", help="JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Allowed slowdown ratio against the baseline")
+    parser.add_argument("--filter", default="", help="Only run cases whose name contains this text")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--quick", action="store_true", help="Smaller sizes, for a fast check")
+    parser.add_argument("--importtime", metavar="MODULE", help="Only report the slowest imports of a module")
+    args = parser.parse_args(argv)
+
+    if args.importtime:
+        for cumulative_us, self_us, name in import_times(args.importtime):
+            print(f"{cumulative_us / 1000:9.1f} ms cumulative {self_us / 1000:9.1f} ms self  {name}")
+        return 0
+
+    results = {}
+    for case in all_cases(args.quick):
+        if args.filter in case.name:
+            results[case.name] = measure(case, args.repeat)
+            print(f"{case.name:45s} {results[case.name]['best'] * 1e6:12.3f} µs/op", file=sys.stderr)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "cases": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        print(json.dumps(report, indent=2))
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["cases"]
+        regressions = compare(results, baseline, args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
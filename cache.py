@@ -0,0 +1,118 @@
+from typing import Any, Callable, Optional, Type
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import time
+
+from pydantic import BaseModel
+
+
+class ResponseCache:
+    def __init__(self, path: str = "./cache/llm_responses.sqlite", max_entries: int = 100_000, bypass: bool = False):
+        """
+        Persistent, content-addressed cache of LLM responses
+        :param path: SQLite database file, or ":memory:"
+        :param max_entries: Least recently used entries are evicted past this size
+        :param bypass: Skip lookups and always call the LLM (fresh responses are still stored)
+        """
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, model TEXT, response TEXT, created REAL, last_used REAL)"
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.connection.commit()
+
+    @staticmethod
+    def key(model: str, template: str, arguments: dict) -> str:
+        """Content address of a call: hash of the model, prompt template and rendered arguments"""
+        payload = json.dumps([model, template, arguments], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str, response_model: Type[BaseModel]) -> Optional[BaseModel]:
+        if self.bypass:
+            self.misses += 1
+            return None
+        row = self.connection.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.connection.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+        self.connection.commit()
+        return response_model.model_validate_json(row[0])
+
+    def put(self, key: str, model: str, response: BaseModel):
+        now = time.time()
+        self.connection.execute(
+            "INSERT OR REPLACE INTO responses (key, model, response, created, last_used) VALUES (?, ?, ?, ?, ?)",
+            (key, model, response.model_dump_json(), now, now),
+        )
+        self.connection.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+        self.connection.commit()
+
+    def __len__(self):
+        return self.connection.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "entries": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        self.connection.execute("DELETE FROM responses")
+        self.connection.commit()
+
+    def close(self):
+        self.connection.close()
+
+    def wrap(self, fn: Callable[..., Any], model: str, template: str, response_model: Type[BaseModel]) -> Callable[..., Any]:
+        """
+        Return a cached version of an LLM call, sync or async, such as llm.haiku_play
+        The cache key uses every argument of the call, defaults included
+        """
+        signature = inspect.signature(fn)
+
+        def make_key(args, kwargs) -> str:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return self.key(model, template, dict(bound.arguments))
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def cached_call_async(*args, **kwargs):
+                key = make_key(args, kwargs)
+                response = self.get(key, response_model)
+                if response is None:
+                    response = await fn(*args, **kwargs)
+                    self.put(key, model, response)
+                return response
+            return cached_call_async
+
+        @functools.wraps(fn)
+        def cached_call(*args, **kwargs):
+            key = make_key(args, kwargs)
+            response = self.get(key, response_model)
+            if response is None:
+                response = fn(*args, **kwargs)
+                self.put(key, model, response)
+            return response
+        return cached_call
@@ -1,4 +1,6 @@
+from array import array
 from enum import Enum
+import random
 
 class Suit(Enum):
     HEARTS = "♥"
@@ -6,10 +8,51 @@ class Suit(Enum):
     CLUBS = "♣"
     SPADES = "♠"
 
+# Compact encoding: every card is an int 0..51, code = suit_index * 13 + (rank_value - 1)
+SUITS = tuple(Suit)
+RANKS = ('A', 2, 3, 4, 5, 6, 7, 8, 9, 10, 'J', 'Q', 'K')
+NUM_CARDS = len(SUITS) * len(RANKS)
+
+# Precomputed attribute tables, indexed by card code
+RANK_VALUE = tuple(code % 13 + 1 for code in range(NUM_CARDS))
+SUIT_INDEX = tuple(code // 13 for code in range(NUM_CARDS))
+IS_RED = tuple(SUITS[code // 13] in (Suit.HEARTS, Suit.DIAMONDS) for code in range(NUM_CARDS))
+IS_ODD = tuple(value % 2 == 1 for value in RANK_VALUE)
+IS_FACE = tuple(RANKS[code % 13] in ('J', 'Q', 'K') for code in range(NUM_CARDS))
+IS_NUMERAL = tuple(isinstance(RANKS[code % 13], int) for code in range(NUM_CARDS))
+
+# Bitmasks of card codes (bit `code` set) for each suit, color, rank value and parity
+SUIT_MASK = tuple(sum(1 << code for code in range(NUM_CARDS) if SUIT_INDEX[code] == suit) for suit in range(len(SUITS)))
+RANK_MASK = {value: sum(1 << code for code in range(NUM_CARDS) if RANK_VALUE[code] == value) for value in range(1, 14)}
+COLOR_MASK = {
+    "red": sum(1 << code for code in range(NUM_CARDS) if IS_RED[code]),
+    "black": sum(1 << code for code in range(NUM_CARDS) if not IS_RED[code]),
+}
+PARITY_MASK = {
+    "odd": sum(1 << code for code in range(NUM_CARDS) if IS_ODD[code]),
+    "even": sum(1 << code for code in range(NUM_CARDS) if not IS_ODD[code]),
+}
+
+
+def mask_codes(mask: int):
+    """Yield the card codes whose bit is set in mask"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+def encode(rank, suit) -> int:
+    """Return the compact int code of a (rank, suit) pair"""
+    return SUITS.index(suit) * 13 + RANKS.index(rank)
+
+
 class Card:
-    def __init__(self, rank, suit):
+    __slots__ = ("code",)
+
+    def __new__(cls, rank, suit):
         """
-        Initialize a playing card
+        Return the interned playing card
         :param rank: 2-10, J, Q, K, A
         :param suit: Hearts, Diamonds, Clubs, Spades
         """
@@ -18,75 +61,336 @@ class Card:
                 raise ValueError("Numeric rank must be between 2 and 10")
         elif rank not in ['J', 'Q', 'K', 'A']:
             raise ValueError("Face card rank must be J, Q, K, or A")
-            
+
         if not isinstance(suit, Suit):
             raise ValueError("Suit must be a valid Suit enum value")
-            
-        self.rank = rank
-        self.suit = suit
-        
+
+        return _CARDS[encode(rank, suit)]
+
+    @classmethod
+    def from_code(cls, code: int) -> "Card":
+        """Return the interned card for a compact int code"""
+        return _CARDS[code]
+
+    @classmethod
+    def parse(cls, text: str) -> "Card":
+        """Parse a card from its string representation, e.g. 10♦ or Q♣"""
+        rank, symbol = text[:-1], text[-1]
+        return cls(int(rank) if rank.isdigit() else rank, Suit(symbol))
+
+    @property
+    def rank(self):
+        return RANKS[self.code % 13]
+
+    @property
+    def suit(self) -> Suit:
+        return SUITS[self.code // 13]
+
     @property
     def color(self):
         """Return the color of the card (red or black)"""
-        return "red" if self.suit in [Suit.HEARTS, Suit.DIAMONDS] else "black"
-    
+        return "red" if IS_RED[self.code] else "black"
+
     def __str__(self):
         """String representation of the card"""
         return f"{self.rank}{self.suit.value}"
-    
+
     def __repr__(self):
         """Detailed string representation of the card"""
         return f"Card(rank={self.rank}, suit={self.suit})"
-    
+
     def __eq__(self, other):
         """Compare two cards for equality"""
         if not isinstance(other, Card):
             return False
-        return self.rank == other.rank and self.suit == other.suit
-    
+        return self.code == other.code
+
+    def __hash__(self):
+        return self.code
+
+    def __int__(self):
+        return self.code
+
+    def __reduce__(self):
+        # Keep cards interned across pickling (process pools, snapshots)
+        return (Card.from_code, (self.code,))
+
     def rank_value(self) -> int:
         """Convert card rank to numeric value (Ace=1, Jack=11, Queen=12, King=13)"""
-        if isinstance(self.rank, int):
-            return self.rank
-        # Convert face cards to numbers
-        face_values = {
-            'A': 1,
-            'J': 11,
-            'Q': 12,
-            'K': 13
-        }
-        return face_values.get(self.rank, 0)
+        return RANK_VALUE[self.code]
+
+
+def _intern(code: int) -> Card:
+    card = object.__new__(Card)
+    card.code = code
+    return card
+
+_CARDS = tuple(_intern(code) for code in range(NUM_CARDS))
+
+
+class CardArray:
+    """List-like sequence of cards stored as a compact array of int codes"""
+
+    __hash__ = None
+
+    def __init__(self, cards=()):
+        self.codes = array('B', (card.code for card in cards))
+
+    @classmethod
+    def from_codes(cls, codes) -> "CardArray":
+        cards = cls()
+        cards.codes = array('B', codes)
+        return cards
+
+    def append(self, card: Card):
+        self.codes.append(card.code)
+
+    def extend(self, cards):
+        self.codes.extend(card.code for card in cards)
+
+    def insert(self, position: int, card: Card):
+        self.codes.insert(position, card.code)
+
+    def pop(self, position: int = -1) -> Card:
+        return _CARDS[self.codes.pop(position)]
+
+    def remove(self, card: Card):
+        """Remove the first occurrence of card, raise ValueError if absent"""
+        self.codes.remove(card.code)
+
+    def index(self, card: Card) -> int:
+        return self.codes.index(card.code)
+
+    def count(self, card: Card) -> int:
+        return self.codes.count(card.code)
+
+    def copy(self) -> "CardArray":
+        return CardArray.from_codes(self.codes)
+
+    def clear(self):
+        del self.codes[:]
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        return (_CARDS[code] for code in self.codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CardArray.from_codes(self.codes[index])
+        return _CARDS[self.codes[index]]
+
+    def __setitem__(self, index, card: Card):
+        self.codes[index] = card.code
+
+    def __contains__(self, card):
+        return isinstance(card, Card) and card.code in self.codes
+
+    def __eq__(self, other):
+        if isinstance(other, CardArray):
+            return self.codes == other.codes
+        if isinstance(other, list):
+            return len(other) == len(self.codes) and all(
+                isinstance(card, Card) and card.code == code
+                for card, code in zip(other, self.codes)
+            )
+        return NotImplemented
+
+    def __repr__(self):
+        return f"CardArray([{', '.join(str(card) for card in self)}])"
+
+
+class Mainline:
+    """
+    Append-only sequence of cards stored as int codes.
+    Cards are never removed or replaced, so view(length) is an O(1) snapshot of a prefix
+    """
+
+    __hash__ = None
+
+    def __init__(self, cards=()):
+        self.codes = array('B', (card.code for card in cards))
+
+    @classmethod
+    def from_codes(cls, codes) -> "Mainline":
+        mainline = cls()
+        mainline.codes = array('B', codes)
+        return mainline
+
+    def append(self, card: Card):
+        self.codes.append(card.code)
+
+    def view(self, length: int = None) -> "MainlineView":
+        """Snapshot of the first `length` cards (all of them by default)"""
+        return MainlineView(self, len(self.codes) if length is None else length)
+
+    def copy(self) -> "MainlineView":
+        """Snapshot of the current mainline, without copying it"""
+        return self.view()
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __iter__(self):
+        return (_CARDS[code] for code in self.codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [_CARDS[code] for code in self.codes[index]]
+        return _CARDS[self.codes[index]]
+
+    def __contains__(self, card):
+        return isinstance(card, Card) and card.code in self.codes
+
+    def __add__(self, other) -> list:
+        return list(self) + list(other)
+
+    def __eq__(self, other):
+        if isinstance(other, (Mainline, MainlineView, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __str__(self):
+        return ' → '.join(str(card) for card in self)
+
+    def __repr__(self):
+        return f"Mainline([{', '.join(str(card) for card in self)}])"
+
+
+class MainlineView:
+    """Read-only prefix of a Mainline, rendered to strings only when needed"""
+
+    __slots__ = ('base', 'length')
+    __hash__ = None
+
+    def __init__(self, base: Mainline, length: int):
+        if not 0 <= length <= len(base):
+            raise ValueError(f"View of {length} cards over a mainline of {len(base)}")
+        self.base = base
+        self.length = length
+
+    def codes(self) -> array:
+        return self.base.codes[:self.length]
+
+    def strings(self) -> list:
+        return [str(card) for card in self]
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        codes = self.base.codes
+        return (_CARDS[codes[i]] for i in range(self.length))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [_CARDS[code] for code in self.base.codes[:self.length][index]]
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("MainlineView index out of range")
+        return _CARDS[self.base.codes[index]]
+
+    def __add__(self, other) -> list:
+        return list(self) + list(other)
+
+    def __eq__(self, other):
+        if isinstance(other, (Mainline, MainlineView, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    def __str__(self):
+        return ' → '.join(str(card) for card in self)
+
+    def __repr__(self):
+        return f"MainlineView([{', '.join(str(card) for card in self)}])"
+
 
 class Deck:
-    def __init__(self, num_decks=1):
+    def __init__(self, num_decks=1, compact=False):
         """
         Initialize a deck or multiple decks of cards
         :param num_decks: Number of standard decks to include
+        :param compact: Store the cards as an array of int codes
         """
-        self.cards = []
         ranks = list(range(2, 11)) + ['J', 'Q', 'K', 'A']
-        
-        for _ in range(num_decks):
-            for suit in Suit:
-                for rank in ranks:
-                    self.cards.append(Card(rank, suit))
-                    
-    def shuffle(self):
-        """Shuffle the deck"""
-        from random import shuffle
-        shuffle(self.cards)
-        
+        codes = [encode(rank, suit) for suit in Suit for rank in ranks] * num_decks
+        self.cards = CardArray.from_codes(codes) if compact else [_CARDS[code] for code in codes]
+
+    def shuffle(self, rng: random.Random = None):
+        """
+        Shuffle the deck
+        :param rng: Random generator to use, the global one by default
+        """
+        shuffle = rng.shuffle if rng is not None else random.shuffle
+        shuffle(self.cards.codes if isinstance(self.cards, CardArray) else self.cards)
+
     def draw(self):
         """Draw a card from the deck"""
         if not self.cards:
             raise ValueError("No cards left in the deck")
         return self.cards.pop()
-    
+
+    def draw_many(self, n: int) -> list:
+        """Draw n cards at once, in the order draw() would return them"""
+        if n > len(self.cards):
+            raise ValueError("Not enough cards left in the deck")
+        if n <= 0:
+            return []
+        codes = self.cards.codes if isinstance(self.cards, CardArray) else None
+        drawn = [_CARDS[code] for code in codes[-n:]] if codes is not None else self.cards[-n:]
+        del (codes if codes is not None else self.cards)[-n:]
+        drawn.reverse()
+        return drawn
+
     def __len__(self):
         """Return the number of cards remaining in the deck"""
         return len(self.cards)
 
 
+class Shoe:
+    def __init__(self, num_decks=1, rng: random.Random = None):
+        """
+        Large multi-deck shoe stored as a count per card code, built in O(52)
+        whatever num_decks is. Each draw samples a card weighted by the remaining
+        counts, which deals the same distribution as a fully shuffled deck.
+        :param num_decks: Number of standard decks to include
+        :param rng: Random generator of the table, a new one by default
+        """
+        self.counts = [num_decks] * NUM_CARDS
+        self.remaining = num_decks * NUM_CARDS
+        self.rng = rng or random.Random()
+
+    def shuffle(self, rng: random.Random = None):
+        """Nothing to shuffle: draws are random. Only switches the random generator if given"""
+        if rng is not None:
+            self.rng = rng
+
+    def draw(self):
+        """Draw a card from the shoe"""
+        if not self.remaining:
+            raise ValueError("No cards left in the deck")
+        target = self.rng.randrange(self.remaining)
+        counts = self.counts
+        for code in range(NUM_CARDS):
+            target -= counts[code]
+            if target < 0:
+                counts[code] -= 1
+                self.remaining -= 1
+                return _CARDS[code]
+
+    def draw_many(self, n: int) -> list:
+        """Draw n cards at once"""
+        if n > self.remaining:
+            raise ValueError("Not enough cards left in the deck")
+        return [self.draw() for _ in range(n)]
+
+    def __len__(self):
+        """Return the number of cards remaining in the shoe"""
+        return self.remaining
+
+
 if __name__ == "__main__":
     deck = Deck(num_decks=6)
     print(deck.draw())
@@ -94,4 +398,4 @@ if __name__ == "__main__":
     print(deck.draw())
     print(deck.draw())
     print(deck.draw())
-    print(deck.draw())
\ No newline at end of file
+    print(deck.draw())
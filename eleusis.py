@@ -1,39 +1,75 @@
 from gametable import GameTable, Player
-from cards import Card
+from cards import Card, Mainline, MainlineView
 from enum import Enum
-from typing import Callable, List, Optional, Tuple
-import random
-import json
-import sys
-import os
-from rules import get_random_rule
+from typing import TYPE_CHECKING, Callable, List, Optional, Tuple
+from rules import Rule, as_rule, get_random_rule
+from transitions import compile_rule
+from hypothesis import check_hypothesis
+from perspective import PerspectiveRenderer
+from history import HistoryWriter
+from instrumentation import Instrumentation
+import time
 from time import sleep
 import datetime
-from llm import Action, Hypothesis, CardIndex, haiku_play, test_hypothesis
+
+# The LLM layer (pydantic, mirascope, API clients) is only imported once an LLM game needs it
+if TYPE_CHECKING:
+    from schemas import Action, Actions, HypothesisValidation, HypothesisValidations
+
+# Result of an empty hypothesis: the player makes no claim, is not judged and draws no cards
+NO_CLAIM = "NO CLAIM"
+
 class GamePhase(Enum):
     PLAYING = "playing"
     RULE_DISCOVERY = "rule_discovery"
     SCORING = "scoring"
 
 class EleusisGame:
-    def __init__(self, num_players: int):
-        self.table = GameTable(num_players)
+    def __init__(self, num_players: int, compact: bool = False, seed: Optional[int] = None, verbose: bool = True,
+                 num_decks: int = 1, shoe: bool = False, rule_weights: Optional[List[float]] = None,
+                 compact_perspective: bool = False):
+        """
+        :param rule_weights: Selection weight of each rule of RULES (see analysis.py), uniform by default
+        :param compact_perspective: Summarize the older mainline, invalid plays and hypotheses in player perspectives
+        """
+        self.table = GameTable(num_players, num_decks, compact=compact, seed=seed, shoe=shoe)
+        self.verbose = verbose
+        self.rule_weights = rule_weights
         self.prophet: Optional[Player] = None
         self.current_rule: Optional[Callable[[List[Card]], bool]] = None
         self.current_rule_description: str = ""
         self.phase = GamePhase.PLAYING
-        self.mainline: List[Card] = []
-        self.sidelines: List[Tuple[Card, List[Card]]] = []
+        self.mainline = Mainline()
+        # Invalid plays, with a view of the mainline at the time they were rejected
+        self.sidelines: List[Tuple[Card, MainlineView]] = []
+        self.renderer = PerspectiveRenderer(compact=compact_perspective)
+        # Incremental form of current_rule and its state after the first `_rule_state_len` mainline cards
+        self._rule_source: Optional[Callable[[List[Card]], bool]] = None
+        self._rule: Optional[Rule] = None
+        self._rule_state = None
+        self._rule_state_len = 0
         
         self.scores = {player: 0 for player in self.table.players}
+        self.invalid_plays = {player: 0 for player in self.table.players}
         self.current_player_idx = 0
         self.history = []
         
+    @property
+    def mainline(self) -> Mainline:
+        return self._mainline
+
+    @mainline.setter
+    def mainline(self, cards):
+        """Replace the mainline, e.g. from a list of cards when restoring a game"""
+        self._mainline = cards if isinstance(cards, Mainline) else Mainline(cards)
+        self._rule_source = None
+
     def setup_round(self, prophet_idx: int):
         """Setup a new round with a new prophet"""
         self.prophet = self.table.players[prophet_idx]
-        self.mainline = []
+        self.mainline = Mainline()
         self.sidelines = []
+        self.renderer.reset()
         self.phase = GamePhase.PLAYING
         
         # Deal cards
@@ -44,21 +80,32 @@ class EleusisGame:
         
     def set_rule(self):
         """Prophet sets the rule by randomly selecting one"""
-        self.current_rule, self.current_rule_description = get_random_rule()
+        self.current_rule, self.current_rule_description = get_random_rule(self.table.rng, self.rule_weights)
         
     def play_card(self, player: Player, card: Card) -> bool:
         """
         Player attempts to play a card
         Returns True if card was valid according to rule, None if game is over
         """
-        if player not in self.table.players or card not in player.hand:
+        if player not in self.table.players or not player.has_card(card):
             return False
             
-        is_valid = self.current_rule(self.mainline + [card])
+        transitions = compile_rule(self.current_rule)
+        if transitions is not None:
+            is_valid = transitions.is_valid(self.mainline, card)
+        else:
+            self._sync_rule_state()
+            is_valid = self._rule.accepts(self._rule_state, card)
         
+        self._sync_renderer()
         if is_valid:
+            if transitions is None:
+                self._rule_state = self._rule.advance(self._rule_state, card)
+                self._rule_state_len += 1
             self.mainline.append(card)
-            print(f"Player {player} played {card} - valid")
+            self.renderer.add_valid(card)
+            if self.verbose:
+                print(f"Player {player} played {card} - valid")
             self.scores[player] += 1
             player.remove_card(card)
             self.history.append({
@@ -67,20 +114,22 @@ class EleusisGame:
                 "action": "PLAY",
                 "card": str(card),
                 "valid": True,
-                "mainline": [str(c) for c in self.mainline],
+                "mainline": self.mainline.view(),
                 "scores": {str(p): s for p, s in self.scores.items()}
             })
             self.next_player()
             
         else:
-            self.sidelines.append((card, self.mainline.copy()))
+            self.sidelines.append((card, self.mainline.view()))
+            self.renderer.add_invalid(card)
+            self.invalid_plays[player] += 1
             self.history.append({
                 "turn": len(self.history),
                 "player": str(player),
                 "action": "PLAY",
                 "card": str(card),
                 "valid": False,
-                "mainline": [str(c) for c in self.mainline],
+                "mainline": self.mainline.view(),
                 "scores": {str(p): s for p, s in self.scores.items()}
             })
             self.deal_cards(player, 2)
@@ -92,6 +141,16 @@ class EleusisGame:
         
         return is_valid
         
+    def legal_cards(self, player: Player) -> List[Card]:
+        """Return the cards in the player's hand that the current rule would accept"""
+        transitions = compile_rule(self.current_rule)
+        if transitions is not None:
+            if not self.mainline:
+                return list(dict.fromkeys(player.hand))
+            return player.legal_cards(transitions.successor_masks[self.mainline[-1].code])
+        self._sync_rule_state()
+        return [card for card in dict.fromkeys(player.hand) if self._rule.accepts(self._rule_state, card)]
+
     def claim_prophet(self, player: Player) -> bool:
         """
         Player claims to know the rule and becomes temporary prophet
@@ -108,25 +167,30 @@ class EleusisGame:
         for _ in range(num_cards):
             self.table.draw_card(player)
 
-    def score_round(self):
-        """Score the round based on valid/invalid plays"""
+    def score_round(self) -> bool:
+        """
+        Score the round based on valid/invalid plays
+        Returns True if the prophet earned the bonus
+        """
         self.phase = GamePhase.SCORING
         
         # Score based on correct/incorrect plays
-        for player, sideline in self.sidelines.items():
+        for player, num_invalid in self.invalid_plays.items():
             # Subtract points for incorrect plays
-            self.scores[player] -= len(sideline) * 2
+            self.scores[player] -= num_invalid * 2
             
         # Add points for correct plays
         for player in self.table.players:
-            player_cards = [c for c in self.mainline if c in player.hand]
+            player_cards = [c for c in self.mainline if player.has_card(c)]
             self.scores[player] += len(player_cards) * 5
             
         # Bonus for prophet if rule was good
-        total_plays = len(self.mainline) + sum(len(s) for s in self.sidelines)
-        valid_ratio = len(self.mainline) / total_plays
-        if 0.2 <= valid_ratio <= 0.8:
+        total_plays = len(self.mainline) + len(self.sidelines)
+        valid_ratio = len(self.mainline) / total_plays if total_plays else 0.0
+        prophet_bonus = 0.2 <= valid_ratio <= 0.8
+        if prophet_bonus:
             self.scores[self.prophet] += 25
+        return prophet_bonus
             
     def get_game_state(self) -> dict:
         """Return current game state in a human-readable format"""
@@ -172,14 +236,10 @@ class EleusisGame:
         Return game state from a specific player's perspective, formatted for LLM input.
         Includes game history and available cards, but not the rule.
         """
-        # Format mainline history
-        mainline_str = ' → '.join([str(card) for card in self.mainline]) if self.mainline else "Empty"
-        
-        # Format invalid plays history with their contexts
-        sidelines_str = '\n'.join([
-            f"  {str(card)} was invalid when mainline was: {' → '.join(str(c) for c in history)}"
-            for card, history in self.sidelines
-        ]) if self.sidelines else "None"
+        # Mainline and invalid plays come from the incremental renderer
+        self._sync_renderer()
+        mainline_str = self.renderer.mainline()
+        sidelines_str = self.renderer.sidelines_text()
         
         # Get player's current hand
         hand_str = ', '.join([str(card) for card in player.hand])
@@ -201,64 +261,168 @@ You are {player} and it's {'your turn' if self.get_current_player() == player el
 """
         return output
     
+    def _sync_rule_state(self):
+        """Replay the mainline into the rule state if the rule or the mainline were changed directly"""
+        if self._rule_source is not self.current_rule or self._rule_state_len != len(self.mainline):
+            self._rule_source = self.current_rule
+            self._rule = as_rule(self.current_rule)
+            self._rule_state = self._rule.state_of(self.mainline)
+            self._rule_state_len = len(self.mainline)
+
+    def _sync_renderer(self):
+        """Rebuild the renderer buffers if the mainline or sidelines were changed directly"""
+        if self.renderer.mainline_len != len(self.mainline) or len(self.renderer.sidelines) != len(self.sidelines):
+            self.renderer.rebuild(self.mainline, self.sidelines)
+
     def terminate(self):
         """Terminate the game"""
         # remove all players hands
         for player in self.table.players:
-            player.hand = []
+            player.clear_hand()
 
 class LLM:
-    def __init__(self, play_fn: Callable[[str], Action]):
+    def __init__(self, play_fn: Callable[[str], "Action"], batch_fn: Optional[Callable[[List[str]], "Actions"]] = None):
+        """
+        :param play_fn: Player call, perspective -> Action
+        :param batch_fn: Call choosing the actions of several players in one request, e.g. llm.play_batch
+        """
         self.play_fn = play_fn
+        self.batch_fn = batch_fn
         
-    def play(self, perspective: str) -> Action:
+    def play(self, perspective: str) -> "Action":
         return self.play_fn(perspective)
 
+    def play_batch(self, perspectives: List[str]) -> "Actions":
+        """Return one action per perspective, in a single request when batch_fn is set"""
+        if self.batch_fn is not None:
+            return self.batch_fn(perspectives)
+        from schemas import Actions
+        return Actions(actions=[self.play_fn(perspective) for perspective in perspectives])
+
 
 class EleusisLLM(EleusisGame):
-    def __init__(self, llm: LLM):
-        super().__init__(1)
+    def __init__(self, llm: LLM, seed: Optional[int] = None, verbose: bool = True,
+                 judge_fn: Optional[Callable[[str, str, str], "HypothesisValidation"]] = None,
+                 instrumentation: Optional[Instrumentation] = None, num_players: int = 1,
+                 batch_judge_fn: Optional[Callable[[List[str], str, str], "HypothesisValidations"]] = None,
+                 compact_perspective: bool = False):
+        """
+        :param num_players: Players driven by the LLM; with more than one the game is played by rounds,
+            each with one batched play call and at most one batched judge call
+        :param judge_fn: Judge call, (hypothesis, rule, game_state) -> HypothesisValidation, defaults to llm.test_hypothesis
+        :param batch_judge_fn: Judge call, (hypotheses, rule, game_state) -> HypothesisValidations, defaults to llm.judge_batch
+        :param compact_perspective: Keep the perspectives bounded in long games, see EleusisGame
+        """
+        super().__init__(num_players, seed=seed, verbose=verbose, compact_perspective=compact_perspective)
         self.llm = llm
+        self.judge_fn = judge_fn
+        self.batch_judge_fn = batch_judge_fn
+        self.instrumentation = instrumentation or Instrumentation()
         self.previous_rounds = []
 
-    def make_game(self, sleep_time: float = 0.5) -> EleusisGame:
-        
-        self.setup_round(0)
+    def make_game(self, sleep_time: float = 0.5, log_format: str = "jsonl", checkpoint: Optional[str] = None,
+                  resume: bool = False) -> EleusisGame:
+        """
+        :param checkpoint: Snapshot file rewritten after every turn (see snapshot.py)
+        :param resume: Continue a game restored with snapshot.load instead of starting a new round
+        """
+        if not resume:
+            self.setup_round(0)
+        if checkpoint is not None:
+            from snapshot import save
         
         # Setup history file
         timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"./logs/game_history_{timestamp}.jsonl"
-        
-        os.makedirs("./logs", exist_ok=True)
+        extension = "jsonl" if log_format == "jsonl" else "elh"
+        filename = f"./logs/game_history_{timestamp}.{extension}"
         
-        while not self.is_over():
-            current_player = self.get_current_player()
-            perspective = self._build_player_perspective(current_player)
-            action = self.llm.play(perspective)
-            
-            # Record action and process it
-            history_entry = self._process_player_action(current_player, action)
-            
-            # Save history
-            with open(filename, "a") as f:
-                f.write(json.dumps(history_entry) + "\n")
-            
-            sleep(sleep_time)
+        with HistoryWriter(filename, log_format) as writer:
+            while len(self.table.players) > 1 and not self.is_over():
+                for history_entry in self.play_round():
+                    with self.instrumentation.span("log_io"):
+                        writer.write(history_entry)
+                if checkpoint is not None:
+                    with self.instrumentation.span("checkpoint"):
+                        save(self, checkpoint)
+                sleep(sleep_time)
+
+            while not self.is_over():
+                current_player = self.get_current_player()
+                with self.instrumentation.span("perspective"):
+                    perspective = self._build_player_perspective(current_player)
+                with self.instrumentation.span("llm_play"):
+                    start = time.perf_counter()
+                    action = self.llm.play(perspective)
+                    self.instrumentation.record_llm_call("play", action, time.perf_counter() - start)
+                
+                # Record action and process it
+                history_entry = self._process_player_action(current_player, action)
+                
+                # Save history
+                with self.instrumentation.span("log_io"):
+                    writer.write(history_entry)
+                if checkpoint is not None:
+                    with self.instrumentation.span("checkpoint"):
+                        save(self, checkpoint)
+                
+                sleep(sleep_time)
             
         return
 
+    def play_round(self) -> List[dict]:
+        """
+        Let every player act once, all choosing from the state at the start of the round,
+        and judge their hypotheses together at the end of the round; return the history entries
+        """
+        num_players = len(self.table.players)
+        first = self.current_player_idx
+        order = [(first + i) % num_players for i in range(num_players)]
+        with self.instrumentation.span("perspective"):
+            perspectives = [self._build_player_perspective(self.table.players[idx]) for idx in order]
+        with self.instrumentation.span("llm_play"):
+            start = time.perf_counter()
+            actions = self.llm.play_batch(perspectives)
+            self.instrumentation.record_llm_call("play_batch", actions, time.perf_counter() - start)
+
+        played = []
+        for idx, action in zip(order, actions.actions):
+            if self.is_over():
+                break
+            self.current_player_idx = idx
+            player = self.table.players[idx]
+            with self.instrumentation.span("play_card"):
+                played.append((player, action, self._play_action_card(player, action)))
+
+        with self.instrumentation.span("judge"):
+            verdicts = self.validate_hypotheses([action.general_hypothesis for _, action, _ in played])
+        with self.instrumentation.span("record"):
+            for (player, action, history_entry), (valid, reason) in zip(played, verdicts):
+                self._record_hypothesis_result(player, action, history_entry, valid, reason)
+        self.current_player_idx = first
+        return [history_entry for _, _, history_entry in played]
+
     def _build_player_perspective(self,player: Player) -> str:
         """Build enhanced perspective including history and previous thoughts"""
         perspective = self.get_player_perspective(player)
         if self.previous_rounds:
             perspective += f"\n\nHistory of your previous rounds:\n"
-            for round in self.previous_rounds:
-                perspective += f"{round['current_player_hypothesis']} ({round['current_player_hypothesis_result']})\n"
-        print(f"{perspective}\n{self.current_rule_description}")
+            perspective += self.renderer.hypotheses_text()
+        if self.verbose:
+            print(f"{perspective}\n{self.current_rule_description}")
         return perspective
 
-    def _process_player_action(self, player: Player, action: Action) -> dict:
+    def _process_player_action(self, player: Player, action: "Action") -> dict:
         """Process player action and return history entry"""
+        with self.instrumentation.span("play_card"):
+            history_entry = self._play_action_card(player, action)
+        with self.instrumentation.span("judge"):
+            valid, reason = self.validate_hypothesis(action.general_hypothesis)
+        with self.instrumentation.span("record"):
+            self._record_hypothesis_result(player, action, history_entry, valid, reason)
+        return history_entry
+
+    def _play_action_card(self, player: Player, action: "Action") -> dict:
+        """Play the card chosen by the action and return the new history entry"""
         
         history_entry = {
             "turn": len(self.history),
@@ -279,38 +443,77 @@ class EleusisLLM(EleusisGame):
                 self.terminate()
                 history_entry["result"] = "game_over"
                 
-        
+        return history_entry
+
+    def _record_hypothesis_result(self, player: Player, action: "Action", history_entry: dict, valid: Optional[bool], reason: str):
+        """Apply the judge verdict on the action's hypothesis and complete the history entry"""
         hypothesis = action.general_hypothesis
         history_entry["hypothesis"] = hypothesis
-        valid, reason = self.validate_hypothesis(hypothesis)
         history_entry["hypothesis_valid"] = valid
         
         if valid:
             self.terminate()
-        else:
+        elif valid is not None:
             self.deal_cards(player, 2)
         history_entry["result"] = reason
 
         # Add game state snapshot
         history_entry["game_state"] = {
-            "mainline": [str(c) for c in self.mainline],
+            "mainline": self.mainline.view(),
             "scores": {str(p): s for p, s in self.scores.items()},
             "current_player_hand": [str(c) for c in player.hand]
         }
         self.previous_rounds.append({
-            "mainline": [str(c) for c in self.mainline],
+            "mainline": self.mainline.view(),
             "scores": {str(p): s for p, s in self.scores.items()},
             "current_player_hand": [str(c) for c in player.hand],
             "current_player_hypothesis": action.general_hypothesis,
             "current_player_hypothesis_result": history_entry["result"]
         })
-        
-        return history_entry
+        self.renderer.add_hypothesis(action.general_hypothesis, history_entry["result"])
 
     def validate_hypothesis(self, hypothesis: str):
-        """Validate a hypothesis"""
-        response =  test_hypothesis(hypothesis, self.current_rule_description, self.get_game_state())
+        """
+        Validate a hypothesis, exactly when it parses into the rule DSL, with the LLM judge otherwise
+        An empty hypothesis is no claim: (None, NO_CLAIM)
+        """
+        if not hypothesis.strip():
+            return None, NO_CLAIM
+        with self.instrumentation.span("judge_local"):
+            verdict = check_hypothesis(hypothesis, self.current_rule, self.mainline, self.sidelines)
+        if verdict is not None:
+            return verdict
+        with self.instrumentation.span("judge_llm"):
+            start = time.perf_counter()
+            if self.judge_fn is None:
+                from llm import test_hypothesis
+                self.judge_fn = test_hypothesis
+            response = self.judge_fn(hypothesis, self.current_rule_description, self.get_game_state())
+            self.instrumentation.record_llm_call("judge", response, time.perf_counter() - start)
         return response.is_valid, response.reason
+
+    def validate_hypotheses(self, hypotheses: List[str]) -> List[Tuple[bool, str]]:
+        """Validate several hypotheses, sending the ones the rule DSL cannot decide in a single judge call"""
+        verdicts = []
+        with self.instrumentation.span("judge_local"):
+            for hypothesis in hypotheses:
+                if not hypothesis.strip():
+                    verdicts.append((None, NO_CLAIM))
+                    continue
+                verdicts.append(check_hypothesis(hypothesis, self.current_rule, self.mainline, self.sidelines))
+        pending = [i for i, verdict in enumerate(verdicts) if verdict is None]
+        if pending:
+            with self.instrumentation.span("judge_llm"):
+                start = time.perf_counter()
+                if self.batch_judge_fn is None:
+                    from llm import judge_batch
+                    self.batch_judge_fn = judge_batch
+                response = self.batch_judge_fn([hypotheses[i] for i in pending], self.current_rule_description,
+                                               self.get_game_state())
+                self.instrumentation.record_llm_call("judge_batch", response, time.perf_counter() - start)
+            for i, validation in zip(pending, response.validations):
+                verdicts[i] = (validation.is_valid, validation.reason)
+        return verdicts
      
 
     
@@ -320,6 +523,7 @@ class EleusisLLM(EleusisGame):
         
 if __name__ == "__main__":
     
+    from llm import haiku_play
     eleusis = EleusisLLM(LLM(haiku_play))
     
     eleusis.make_game(sleep_time=3)
@@ -1,30 +1,71 @@
 
-from cards import Card, Deck
+from cards import (Card, CardArray, Deck, Shoe, Suit, SUITS, NUM_CARDS, SUIT_MASK, RANK_MASK, COLOR_MASK,
+                   PARITY_MASK, mask_codes)
 from typing import List, Optional
 
 from collections import deque
+import random
 
 class Player:
-    def __init__(self, name: str):
+    def __init__(self, name: str, compact: bool = False):
         self.name = name
-        self.hand: List[Card] = []
+        self.hand: List[Card] = CardArray() if compact else []
+        # Index of the hand: positions of each card code in it, and a bitmask of the codes held
+        self.positions: List[List[int]] = [[] for _ in range(NUM_CARDS)]
+        self.mask = 0
         
     def add_card(self, card: Card):
+        self.positions[card.code].append(len(self.hand))
         self.hand.append(card)
+        self.mask |= 1 << card.code
         
     def remove_card(self, card: Card) -> Optional[Card]:
-        try:
-            self.hand.remove(card)
-            return card
-        except ValueError:
+        if not self.has_card(card):
             return None
+        # The last card takes the freed slot: the engine does not depend on the order of the hand
+        positions = self.positions[card.code]
+        index = positions.pop()
+        last = self.hand.pop()
+        if index < len(self.hand):
+            self.hand[index] = last
+            moved = self.positions[last.code]
+            moved[moved.index(len(self.hand))] = index
+        if not positions:
+            self.mask &= ~(1 << card.code)
+        return card
+
+    def clear_hand(self):
+        self.hand.clear()
+        self.positions = [[] for _ in range(NUM_CARDS)]
+        self.mask = 0
+
+    def has_card(self, card: Card) -> bool:
+        return isinstance(card, Card) and bool(self.positions[card.code])
+
+    def bucket(self, suit: Optional[Suit] = None, color: Optional[str] = None,
+               rank_value: Optional[int] = None, parity: Optional[str] = None) -> List[Card]:
+        """Cards of the hand matching every given attribute, e.g. bucket(color="red", parity="even")"""
+        mask = self.mask
+        if suit is not None:
+            mask &= SUIT_MASK[SUITS.index(suit)]
+        if color is not None:
+            mask &= COLOR_MASK[color]
+        if rank_value is not None:
+            mask &= RANK_MASK[rank_value]
+        if parity is not None:
+            mask &= PARITY_MASK[parity]
+        return [Card.from_code(code) for code in mask_codes(mask)]
+
+    def legal_cards(self, successor_mask: int) -> List[Card]:
+        """Distinct cards of the hand allowed by a rule, given the successor bitmask of the previous card"""
+        return [Card.from_code(code) for code in mask_codes(self.mask & successor_mask)]
             
     def __str__(self):
         return f"Joueur {self.name} ({len(self.hand)} cartes)"
 
 class River:
-    def __init__(self):
-        self.cards: List[Card] = []
+    def __init__(self, compact: bool = False):
+        self.cards: List[Card] = CardArray() if compact else []
         
     def add_card(self, card: Card, position: int = -1):
         """Ajoute une carte à la rivière à une position donnée"""
@@ -48,28 +89,32 @@ class River:
         return " → ".join(str(card) for card in self.cards)
 
 class GameTable:
-    def __init__(self, num_players: int, num_decks: int = 1):
+    def __init__(self, num_players: int, num_decks: int = 1, compact: bool = False, seed: Optional[int] = None,
+                 shoe: bool = False):
         """
         Initialise la table de jeu
         :param num_players: Nombre de joueurs
         :param num_decks: Nombre de paquets de cartes
+        :param compact: Stocke les cartes sous forme de tableaux d'entiers
+        :param seed: Graine du générateur aléatoire de la table
+        :param shoe: Utilise un sabot à tirage aléatoire (Shoe) au lieu d'un paquet mélangé
         """
         # if num_players < 2:
         #     raise ValueError("Il faut au moins 2 joueurs")
             
-        self.deck = Deck(num_decks)
-        self.deck.shuffle()
-        self.river = River()
-        self.players = [Player(f"Joueur_{i+1}") for i in range(num_players)]
+        self.rng = random.Random(seed)
+        self.deck = Shoe(num_decks, self.rng) if shoe else Deck(num_decks, compact)
+        self.deck.shuffle(self.rng)
+        self.river = River(compact)
+        self.players = [Player(f"Joueur_{i+1}", compact) for i in range(num_players)]
         self.current_player_idx = 0
         self.direction = 1  # 1 pour sens horaire, -1 pour sens anti-horaire
         
     def deal_initial_cards(self, cards_per_player: int):
         """Distribue les cartes initiales aux joueurs"""
-        for _ in range(cards_per_player):
-            for player in self.players:
-                if len(self.deck) > 0:
-                    player.add_card(self.deck.draw())
+        cards = self.deck.draw_many(min(cards_per_player * len(self.players), len(self.deck)))
+        for i, card in enumerate(cards):
+            self.players[i % len(self.players)].add_card(card)
                     
     def next_turn(self):
         """Passe au joueur suivant"""
@@ -88,7 +133,7 @@ class GameTable:
         Joue une carte depuis la main d'un joueur
         :return: True si la carte a été jouée, False sinon
         """
-        if card not in player.hand:
+        if not player.has_card(card):
             return False
         
         player.remove_card(card)
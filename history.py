@@ -0,0 +1,297 @@
+from typing import BinaryIO, Dict, Iterator, List, Optional
+import datetime
+import json
+import os
+import struct
+
+from cards import Card, MainlineView
+
+MAGIC = b"ELHB"
+VERSION = 1
+
+# Record types of the binary format
+STRING = 0      # defines the next string id
+TURN = 1        # one history entry, mainline given as a delta
+MAINLINE = 2    # full mainline, written when it is not a continuation (e.g. a new round)
+RESET = 3       # clears the string table, mainline and last card, written when a writer appends to a log
+
+# Turn flags
+HAS_CARD = 1
+WAS_VALID = 2
+GAME_OVER = 4
+HYPOTHESIS_VALID = 8
+ACCEPTED = 16
+NO_VERDICT = 32  # hypothesis_valid is None, e.g. an empty hypothesis (no claim)
+
+
+def _varint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def _zigzag(value: int) -> int:
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value: int) -> int:
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+class _Buffer:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.position = 0
+
+    def varint(self) -> int:
+        result = shift = 0
+        while True:
+            byte = self.data[self.position]
+            self.position += 1
+            result |= (byte & 0x7F) << shift
+            if not byte & 0x80:
+                return result
+            shift += 7
+
+    def signed(self) -> int:
+        return _unzigzag(self.varint())
+
+    def double(self) -> float:
+        value, = struct.unpack_from("<d", self.data, self.position)
+        self.position += 8
+        return value
+
+
+def _encode_cards(codes: List[int]) -> bytes:
+    out = bytearray(_varint(len(codes)))
+    previous = 0
+    for code in codes:
+        out += _varint(_zigzag(code - previous))
+        previous = code
+    return bytes(out)
+
+
+def _decode_cards(buffer: _Buffer) -> List[int]:
+    codes = []
+    previous = 0
+    for _ in range(buffer.varint()):
+        previous += buffer.signed()
+        codes.append(previous)
+    return codes
+
+
+def _json_default(value):
+    """Render mainline views lazily, when an entry is actually written"""
+    if isinstance(value, MainlineView):
+        return value.strings()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class HistoryWriter:
+    def __init__(self, path: str, format: str = "jsonl", flush_every: int = 64):
+        """
+        Long-lived, buffered writer of game history entries
+        :param path: Log file, appended to
+        :param format: "jsonl" (one JSON entry per line) or "binary" (compact records, see HistoryReader)
+        :param flush_every: Number of entries between flushes to disk
+        """
+        if format not in ("jsonl", "binary"):
+            raise ValueError("Format must be jsonl or binary")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.format = format
+        self.flush_every = flush_every
+        self.pending = 0
+        if format == "jsonl":
+            self.file = open(path, "a", encoding="utf-8", buffering=1 << 16)
+        else:
+            new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+            self.file: BinaryIO = open(path, "ab", buffering=1 << 16)
+            if new_file:
+                self.file.write(MAGIC + bytes([VERSION]))
+            else:
+                # This writer starts with empty strings and deltas, the reader must forget the previous ones
+                self._record(RESET, b"")
+        self.strings: Dict[str, int] = {}
+        self.mainline: List[int] = []
+        self.mainline_view: Optional[MainlineView] = None
+        self.last_card = 0
+
+    def write(self, entry: dict):
+        if self.format == "jsonl":
+            self.file.write(json.dumps(entry, default=_json_default) + "\n")
+        else:
+            self._write_binary(entry)
+        self.pending += 1
+        if self.pending >= self.flush_every:
+            self.flush()
+
+    def _record(self, kind: int, payload: bytes):
+        self.file.write(_varint(len(payload) + 1) + bytes([kind]) + payload)
+
+    def _string(self, text: Optional[str]) -> bytes:
+        """Return the varint id of a string, defining it on first use (0 means None)"""
+        if text is None:
+            return _varint(0)
+        if text not in self.strings:
+            self.strings[text] = len(self.strings) + 1
+            self._record(STRING, text.encode("utf-8"))
+        return _varint(self.strings[text])
+
+    def _write_binary(self, entry: dict):
+        state = entry.get("game_state", {})
+        mainline = state.get("mainline", [])
+        card = Card.parse(entry["card_played"]).code if "card_played" in entry else None
+
+        flags = 0
+        previous = self.mainline_view
+        if (isinstance(mainline, MainlineView) and previous is not None and mainline.base is previous.base
+                and 0 <= len(mainline) - len(previous) <= 1):
+            # Continuation of the same append-only mainline: no need to compare the cards
+            flags |= ACCEPTED if len(mainline) > len(previous) else 0
+            self.mainline_view = mainline
+        else:
+            codes = list(mainline.codes()) if isinstance(mainline, MainlineView) else [Card.parse(c).code for c in mainline]
+            known = list(previous.codes()) if previous is not None else self.mainline
+            if codes[:len(known)] != known or len(codes) > len(known) + 1:
+                self._record(MAINLINE, _encode_cards(codes))
+            elif len(codes) == len(known) + 1:
+                flags |= ACCEPTED
+            self.mainline = codes
+            self.mainline_view = mainline if isinstance(mainline, MainlineView) else None
+
+        payload = bytearray()
+        if card is not None:
+            flags |= HAS_CARD
+            was_valid = entry.get("was_valid")
+            flags |= WAS_VALID if was_valid else 0
+            flags |= GAME_OVER if was_valid is None else 0
+        flags |= HYPOTHESIS_VALID if entry.get("hypothesis_valid") else 0
+        flags |= NO_VERDICT if entry.get("hypothesis_valid", False) is None else 0
+
+        payload += _varint(entry["turn"])
+        payload += bytes([flags])
+        if card is not None:
+            payload += _varint(_zigzag(card - self.last_card))
+            self.last_card = card
+        timestamp = datetime.datetime.fromisoformat(entry["timestamp"]).timestamp()
+        payload += struct.pack("<d", timestamp)
+        for key in ("player", "rule", "hypothesis", "result"):
+            payload += self._string(entry.get(key))
+        scores = state.get("scores", {})
+        payload += _varint(len(scores))
+        for player, score in scores.items():
+            payload += self._string(player) + _varint(_zigzag(score))
+        payload += _encode_cards([Card.parse(c).code for c in state.get("current_player_hand", [])])
+        self._record(TURN, bytes(payload))
+
+    def flush(self):
+        self.file.flush()
+        self.pending = 0
+
+    def close(self):
+        if not self.file.closed:
+            self.flush()
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class HistoryReader:
+    """Reads JSONL or binary history logs, rebuilding full entries with mainline snapshots"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self.binary = f.read(len(MAGIC)) == MAGIC
+
+    def __iter__(self) -> Iterator[dict]:
+        if not self.binary:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+            return
+
+        with open(self.path, "rb") as f:
+            data = f.read()
+        if data[len(MAGIC)] != VERSION:
+            raise ValueError(f"Unsupported history version {data[len(MAGIC)]}")
+        buffer = _Buffer(data)
+        buffer.position = len(MAGIC) + 1
+        strings: List[Optional[str]] = [None]
+        mainline: List[int] = []
+        last_card = 0
+        while buffer.position < len(data):
+            length = buffer.varint()
+            end = buffer.position + length
+            kind = data[buffer.position]
+            buffer.position += 1
+            if kind == STRING:
+                strings.append(data[buffer.position:end].decode("utf-8"))
+            elif kind == RESET:
+                strings, mainline, last_card = [None], [], 0
+            elif kind == MAINLINE:
+                mainline = _decode_cards(buffer)
+            elif kind == TURN:
+                entry, last_card = self._decode_turn(buffer, strings, mainline, last_card)
+                yield entry
+            buffer.position = end
+
+    @staticmethod
+    def _decode_turn(buffer: _Buffer, strings: List[Optional[str]], mainline: List[int], last_card: int):
+        turn = buffer.varint()
+        flags = buffer.data[buffer.position]
+        buffer.position += 1
+        card = None
+        if flags & HAS_CARD:
+            card = last_card + buffer.signed()
+            last_card = card
+        if flags & ACCEPTED:
+            mainline.append(card)
+        timestamp = buffer.double()
+        player, rule, hypothesis, result = (strings[buffer.varint()] for _ in range(4))
+        scores = {}
+        for _ in range(buffer.varint()):
+            name = strings[buffer.varint()]
+            scores[name] = buffer.signed()
+        hand = _decode_cards(buffer)
+
+        entry = {
+            "turn": turn,
+            "player": player,
+            "hypothesis": hypothesis,
+            "timestamp": datetime.datetime.fromtimestamp(timestamp).isoformat(),
+            "rule": rule,
+        }
+        if card is not None:
+            entry["card_played"] = str(Card.from_code(card))
+            entry["was_valid"] = None if flags & GAME_OVER else bool(flags & WAS_VALID)
+        entry["hypothesis_valid"] = None if flags & NO_VERDICT else bool(flags & HYPOTHESIS_VALID)
+        entry["result"] = result
+        entry["game_state"] = {
+            "mainline": [str(Card.from_code(c)) for c in mainline],
+            "scores": scores,
+            "current_player_hand": [str(Card.from_code(c)) for c in hand],
+        }
+        return entry, last_card
+
+    def entries(self) -> List[dict]:
+        return list(self)
+
+    def snapshot(self, turn: int) -> dict:
+        """Return the full entry of a turn"""
+        for entry in self:
+            if entry["turn"] == turn:
+                return entry
+        raise KeyError(f"No turn {turn} in {self.path}")
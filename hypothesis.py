@@ -0,0 +1,306 @@
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional, Sequence, Tuple
+import re
+
+from cards import Card, NUM_CARDS, RANK_VALUE, SUIT_INDEX, IS_RED, IS_ODD, IS_FACE, IS_NUMERAL
+from transitions import compile_rule
+
+
+class Property:
+    """A property of a single card, e.g. red, even or heart"""
+
+    def __init__(self, name: str, noun: str, plural: str, table: Sequence[bool]):
+        self.name = name
+        self.noun = noun
+        self.plural = plural
+        self.table = tuple(table)
+
+    def __repr__(self):
+        return f"Property({self.name})"
+
+
+PROPERTIES = {
+    "red": Property("red", "a red card", "red cards", IS_RED),
+    "black": Property("black", "a black card", "black cards", [not red for red in IS_RED]),
+    "hearts": Property("hearts", "a heart", "hearts", [suit == 0 for suit in SUIT_INDEX]),
+    "diamonds": Property("diamonds", "a diamond", "diamonds", [suit == 1 for suit in SUIT_INDEX]),
+    "clubs": Property("clubs", "a club", "clubs", [suit == 2 for suit in SUIT_INDEX]),
+    "spades": Property("spades", "a spade", "spades", [suit == 3 for suit in SUIT_INDEX]),
+    "even": Property("even", "an even rank", "even ranks", [not odd for odd in IS_ODD]),
+    "odd": Property("odd", "an odd rank", "odd ranks", IS_ODD),
+    "face": Property("face", "a face card", "face cards", IS_FACE),
+    "letter": Property("letter", "a face card or an ace", "face cards or aces", [not numeral for numeral in IS_NUMERAL]),
+    "numeral": Property("numeral", "a number card", "number cards", IS_NUMERAL),
+}
+
+
+# Rule DSL: every expression decides whether curr may follow prev (card codes)
+
+class Expression(ABC):
+    @abstractmethod
+    def accepts(self, prev: int, curr: int) -> bool:
+        ...
+
+    def table(self) -> bytes:
+        """52×52 accept flags, laid out like transitions.TransitionTable.table"""
+        return bytes(self.accepts(prev, curr) for prev in range(NUM_CARDS) for curr in range(NUM_CARDS))
+
+
+class Always(Expression):
+    def accepts(self, prev, curr):
+        return True
+
+    def __str__(self):
+        return "Any card can be played"
+
+
+class Every(Expression):
+    """Every card must have the property"""
+
+    def __init__(self, prop: Property):
+        self.prop = prop
+
+    def accepts(self, prev, curr):
+        return self.prop.table[curr]
+
+    def phrase(self) -> str:
+        return self.prop.noun
+
+    def __str__(self):
+        return f"Every card must be {self.prop.noun}"
+
+
+class Relation(Expression):
+    """The card must relate to the previous card, e.g. higher rank or same suit"""
+
+    PHRASES = {
+        "higher": "higher rank",
+        "lower": "lower rank",
+        "same_suit": "the same suit",
+        "same_color": "the same color",
+        "same_rank": "the same rank",
+        "different_suit": "a different suit",
+        "different_color": "a different color",
+        "different_rank": "a different rank",
+        "different_parity": "a different parity",
+        "same_suit_or_rank": "the same suit or the same rank",
+    }
+
+    def __init__(self, kind: str):
+        if kind not in self.PHRASES:
+            raise ValueError(f"Unknown relation {kind}")
+        self.kind = kind
+
+    def accepts(self, prev, curr):
+        kind = self.kind
+        if kind == "higher":
+            return RANK_VALUE[curr] > RANK_VALUE[prev]
+        if kind == "lower":
+            return RANK_VALUE[curr] < RANK_VALUE[prev]
+        if kind == "same_suit_or_rank":
+            return SUIT_INDEX[curr] == SUIT_INDEX[prev] or RANK_VALUE[curr] == RANK_VALUE[prev]
+        same, attribute = kind.split("_", 1)
+        table = {"suit": SUIT_INDEX, "color": IS_RED, "rank": RANK_VALUE, "parity": IS_ODD}[attribute]
+        return (table[curr] == table[prev]) == (same == "same")
+
+    def phrase(self) -> str:
+        return self.PHRASES[self.kind]
+
+    def __str__(self):
+        if self.kind == "different_color":
+            return "Cards must alternate between red and black"
+        if self.kind == "different_parity":
+            return "Cards must alternate between odd and even ranks"
+        if self.kind in ("higher", "lower"):
+            return f"Each card must have {self.phrase()} than the previous card"
+        if self.kind.startswith("different"):
+            return f"Each card must have {self.phrase()} from the previous card"
+        return f"Each card must have {self.phrase()} as the previous card"
+
+
+class After(Expression):
+    """After a card with the property, the next card must satisfy the consequent"""
+
+    def __init__(self, prop: Property, consequent: Expression):
+        self.prop = prop
+        self.consequent = consequent
+
+    def accepts(self, prev, curr):
+        return not self.prop.table[prev] or self.consequent.accepts(prev, curr)
+
+    def __str__(self):
+        return f"After {self.prop.noun}, the next card must be {self.consequent.phrase()}"
+
+
+class NotTwoInARow(Expression):
+    def __init__(self, prop: Property):
+        self.prop = prop
+
+    def accepts(self, prev, curr):
+        return not (self.prop.table[prev] and self.prop.table[curr])
+
+    def __str__(self):
+        return f"Cannot play two {self.prop.plural} in a row"
+
+
+class SumAtMost(Expression):
+    def __init__(self, limit: int):
+        self.limit = limit
+
+    def accepts(self, prev, curr):
+        return RANK_VALUE[prev] + RANK_VALUE[curr] <= self.limit
+
+    def __str__(self):
+        return f"The sum of two consecutive card values must be at most {self.limit}"
+
+
+# Parser: maps common hypothesis phrasings into the DSL, returns None when unsure
+
+_PROPERTY_PATTERNS = [
+    (r"(?:an? )?red(?: cards?)?", "red"),
+    (r"(?:an? )?black(?: cards?)?", "black"),
+    (r"(?:an? )?(?:hearts?|card of hearts)", "hearts"),
+    (r"(?:an? )?(?:diamonds?|card of diamonds)", "diamonds"),
+    (r"(?:an? )?(?:clubs?|card of clubs)", "clubs"),
+    (r"(?:an? )?(?:spades?|card of spades)", "spades"),
+    (r"(?:an? )?even(?: ranks?| cards?| numbers?| values?| ranked cards?)?", "even"),
+    (r"(?:an? )?odd(?: ranks?| cards?| numbers?| values?| ranked cards?)?", "odd"),
+    (r"(?:an? )?face cards?(?: \(j, ?q, ?k\))?", "face"),
+    (r"(?:an? )?(?:face cards? or (?:an )?aces?|face cards? \(a, ?j, ?q, ?k\)|letter cards?)", "letter"),
+    (r"(?:an? )?(?:number|numbered|numeral|non-face) cards?", "numeral"),
+]
+
+_RELATION_PATTERNS = [
+    (r"(?:an? |of )?(?:strictly )?higher(?: rank| value| number)?(?: card)?", "higher"),
+    (r"(?:an? |of )?(?:strictly )?lower(?: rank| value| number)?(?: card)?", "lower"),
+    (r"(?:(?:either )?(?:the )?same suit or (?:the )?(?:same )?rank|(?:either )?(?:the )?same rank or (?:the )?(?:same )?suit"
+     r"|(?:share )?(?:either )?(?:the )?suit or (?:the )?rank|(?:share )?(?:either )?(?:the )?rank or (?:the )?suit)", "same_suit_or_rank"),
+    (r"(?:of |in |share )?(?:the )?same (suit|color|rank)", "same_{}"),
+    (r"(?:of |in )?an? different (suit|color|rank|parity)", "different_{}"),
+]
+
+_ANY_CARD = r"any card (?:can|may) be played|all cards are (?:valid|accepted)|every card is (?:valid|accepted)"
+_AFTER = (
+    r"(?:after|following|if the (?:previous|last) card (?:is|was)) (?P<prev>.+?),? (?:then )?"
+    r"(?:(?:the )?next card |you |players? )?(?:(?:must|should|has to|have to) (?:be played as |be |play |have )?|play )(?P<curr>.+)"
+)
+_EVERY = r"(?:each|every|the next|all) cards? (?:must|should) (?:be |have |share )?(?P<curr>.+)"
+_ALTERNATE = (
+    r"(?:cards? (?:must )?)?alternate (?:between )?(?P<pair>red and black|black and red|colors"
+    r"|odd and even(?: ranks)?|even and odd(?: ranks)?|parity)|(?:the )?(?P<attr>colors|parity) (?:must )?alternates?"
+)
+_SUM = (
+    r"(?:the )?sum of (?:the )?(?:two |last two )?(?:last )?(?:consecutive )?(?:card )?(?:values|ranks|cards)"
+    r"(?: must be| must| is)? (?P<op>under|less than|below|at most|no more than|not exceed|not more than|less than or equal to) (?P<n>\d+)"
+)
+_NOT_TWO = r"(?:you )?(?:cannot|can't|can not|must not|may not) play two (?P<plural>.+?) in a row|no two consecutive (?P<plural2>.+)"
+
+_FILLERS = [
+    r"^(?:the )?(?:hidden |secret )?rule(?: is)?:? (?:that )?",
+    r"^(?:i think|i believe|my hypothesis is|hypothesis:)(?: that)?,? ",
+]
+_SUITS = {"♥": " hearts ", "♦": " diamonds ", "♣": " clubs ", "♠": " spades "}
+
+
+def _normalize(text: str) -> str:
+    text = text.lower().strip()
+    for symbol, name in _SUITS.items():
+        text = text.replace(symbol, name)
+    text = text.replace("colour", "color").replace("’", "'").replace('"', "")
+    text = re.sub(r"\s+", " ", text).replace(" ,", ",").strip().rstrip(".!")
+    for filler in _FILLERS:
+        text = re.sub(filler, "", text)
+    return text
+
+
+def parse_property(text: str) -> Optional[Property]:
+    for pattern, name in _PROPERTY_PATTERNS:
+        if re.fullmatch(pattern, text):
+            return PROPERTIES[name]
+    return None
+
+
+def parse_relation(text: str) -> Optional[Relation]:
+    text = re.sub(r" (?:than|as|from|with|to) (?:that of )?(?:the )?(?:previous|last|prior)(?: card| one)?$", "", text)
+    for pattern, kind in _RELATION_PATTERNS:
+        match = re.fullmatch(pattern, text)
+        if match:
+            return Relation(kind.format(*match.groups()))
+    return None
+
+
+def _parse_consequent(text: str) -> Optional[Expression]:
+    prop = parse_property(text)
+    return Every(prop) if prop is not None else parse_relation(text)
+
+
+def parse(hypothesis: str) -> Optional[Expression]:
+    """Parse a hypothesis into the rule DSL, or return None if the phrasing is not understood"""
+    text = _normalize(hypothesis)
+
+    if re.fullmatch(_ANY_CARD, text):
+        return Always()
+
+    match = re.fullmatch(_ALTERNATE, text)
+    if match:
+        pair = match.group("pair") or match.group("attr")
+        return Relation("different_color" if pair in ("red and black", "black and red", "colors") else "different_parity")
+
+    match = re.fullmatch(_SUM, text)
+    if match:
+        limit = int(match.group("n"))
+        return SumAtMost(limit - 1 if match.group("op") in ("under", "less than", "below") else limit)
+
+    match = re.fullmatch(_NOT_TWO, text)
+    if match:
+        prop = parse_property(match.group("plural") or match.group("plural2"))
+        return NotTwoInARow(prop) if prop is not None else None
+
+    match = re.fullmatch(_AFTER, text)
+    if match:
+        prop = parse_property(match.group("prev"))
+        consequent = _parse_consequent(match.group("curr"))
+        if prop is not None and consequent is not None:
+            return After(prop, consequent)
+        return None
+
+    match = re.fullmatch(_EVERY, text)
+    if match:
+        return _parse_consequent(match.group("curr"))
+
+    return None
+
+
+def check_hypothesis(
+    hypothesis: str,
+    rule: Callable[[List[Card]], bool],
+    mainline: Sequence[Card],
+    sidelines: Sequence[Tuple[Card, Sequence[Card]]],
+) -> Optional[Tuple[bool, str]]:
+    """
+    Judge a hypothesis exactly against the secret rule, with the same verdicts as llm.test_hypothesis
+    Returns None when the hypothesis cannot be parsed or the rule is not window-2
+    """
+    expression = parse(hypothesis)
+    transitions = compile_rule(rule)
+    if expression is None or transitions is None:
+        return None
+
+    table = expression.table()
+    if table == transitions.table:
+        return True, "CORRECT"
+    for prev, curr in zip(mainline, mainline[1:]):
+        if not table[prev.code * NUM_CARDS + curr.code]:
+            return False, "INCORRECT MAINLINE CONTRADICTION"
+    for card, history in sidelines:
+        if history and table[history[-1].code * NUM_CARDS + card.code]:
+            return False, "INCORRECT HISTORY CONTRADICTION"
+    return False, "INCORRECT"
+
+
+if __name__ == "__main__":
+    from rules import RULES
+    for rule, description in RULES:
+        expression = parse(description)
+        verdict = check_hypothesis(description, rule, [], [])
+        print(f"{description!r} -> {expression} -> {verdict}")
@@ -0,0 +1,162 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Callable, Dict, List
+import json
+import os
+import time
+
+
+class Histogram:
+    """Latency samples of one phase, in seconds"""
+
+    def __init__(self):
+        self.values: List[float] = []
+        self._sorted = True
+
+    def add(self, value: float):
+        if self.values and value < self.values[-1]:
+            self._sorted = False
+        self.values.append(value)
+
+    def percentile(self, p: float) -> float:
+        if not self.values:
+            return 0.0
+        if not self._sorted:
+            self.values.sort()
+            self._sorted = True
+        return self.values[min(len(self.values) - 1, int(p / 100 * len(self.values)))]
+
+    def summary(self) -> dict:
+        return {
+            "count": len(self.values),
+            "sum": sum(self.values),
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": max(self.values, default=0.0),
+        }
+
+
+class Instrumentation:
+    def __init__(self):
+        """Per-phase latency histograms, hooks and LLM usage for the game loop"""
+        self.histograms: Dict[str, Histogram] = defaultdict(Histogram)
+        self.hooks: List[Callable[[str, float], None]] = []
+        self.llm_calls: List[dict] = []
+
+    def add_hook(self, hook: Callable[[str, float], None]):
+        """Call hook(phase, seconds) at the end of every span"""
+        self.hooks.append(hook)
+
+    @contextmanager
+    def span(self, phase: str):
+        """Time a phase of the game loop"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.histograms[phase].add(elapsed)
+            for hook in self.hooks:
+                hook(phase, elapsed)
+
+    def record_llm_call(self, name: str, output, seconds: float):
+        """
+        Record the usage of an LLM call from its response model output
+        (mirascope keeps the provider response in output._response).
+        Anthropic reports input_tokens without the prompt-cache reads (cached_tokens)
+        and writes (cache_write_tokens)
+        """
+        response = getattr(output, "_response", None)
+        usage = getattr(response, "usage", None)
+        self.llm_calls.append({
+            "name": name,
+            "seconds": seconds,
+            "input_tokens": getattr(response, "input_tokens", None),
+            "output_tokens": getattr(response, "output_tokens", None),
+            "cached_tokens": getattr(response, "cached_tokens", None),
+            "cache_write_tokens": getattr(usage, "cache_creation_input_tokens", None),
+            "cost": getattr(response, "cost", None),
+        })
+
+    def llm_totals(self) -> Dict[str, dict]:
+        totals: Dict[str, dict] = defaultdict(lambda: {
+            "calls": 0, "input_tokens": 0, "cached_tokens": 0, "cache_write_tokens": 0, "output_tokens": 0, "cost": 0.0,
+        })
+        for call in self.llm_calls:
+            total = totals[call["name"]]
+            total["calls"] += 1
+            for key in ("input_tokens", "cached_tokens", "cache_write_tokens", "output_tokens"):
+                total[key] += call.get(key) or 0
+            total["cost"] += call["cost"] or 0.0
+        for total in totals.values():
+            prompt_tokens = total["input_tokens"] + total["cached_tokens"] + total["cache_write_tokens"]
+            total["cache_hit_ratio"] = total["cached_tokens"] / prompt_tokens if prompt_tokens else 0.0
+        return dict(totals)
+
+    def summary(self) -> dict:
+        return {
+            "phases": {phase: histogram.summary() for phase, histogram in self.histograms.items()},
+            "llm": self.llm_totals(),
+        }
+
+    def export_json(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def export_prometheus(self, path: str):
+        """Write the metrics in the Prometheus text exposition format"""
+        lines = [
+            "# TYPE eleusis_phase_seconds summary",
+        ]
+        for phase, histogram in self.histograms.items():
+            summary = histogram.summary()
+            for key, quantile in (("p50", "0.5"), ("p95", "0.95"), ("p99", "0.99")):
+                lines.append(f'eleusis_phase_seconds{{phase="{phase}",quantile="{quantile}"}} {summary[key]}')
+            lines.append(f'eleusis_phase_seconds_sum{{phase="{phase}"}} {summary["sum"]}')
+            lines.append(f'eleusis_phase_seconds_count{{phase="{phase}"}} {summary["count"]}')
+        lines += ["# TYPE eleusis_llm_tokens_total counter", "# TYPE eleusis_llm_cost_dollars_total counter"]
+        for name, total in self.llm_totals().items():
+            lines.append(f'eleusis_llm_tokens_total{{call="{name}",kind="input"}} {total["input_tokens"]}')
+            lines.append(f'eleusis_llm_tokens_total{{call="{name}",kind="cached"}} {total["cached_tokens"]}')
+            lines.append(f'eleusis_llm_tokens_total{{call="{name}",kind="cache_write"}} {total["cache_write_tokens"]}')
+            lines.append(f'eleusis_llm_tokens_total{{call="{name}",kind="output"}} {total["output_tokens"]}')
+            lines.append(f'eleusis_llm_cost_dollars_total{{call="{name}"}} {total["cost"]}')
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+@contextmanager
+def profile(path_prefix: str, memory: bool = True, top: int = 30):
+    """
+    Capture a cProfile (path_prefix + ".prof", top functions in path_prefix + ".txt") and,
+    optionally, the tracemalloc allocation top (path_prefix + ".mem.txt") of the wrapped code,
+    e.g. one make_game
+    """
+    # Profiling modules are only needed here, keep them out of the game startup
+    import cProfile
+    import io
+    import pstats
+    import tracemalloc
+    os.makedirs(os.path.dirname(path_prefix) or ".", exist_ok=True)
+    profiler = cProfile.Profile()
+    if memory:
+        tracemalloc.start()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(path_prefix + ".prof")
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats("cumulative").print_stats(top)
+        with open(path_prefix + ".txt", "w") as f:
+            f.write(text.getvalue())
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            with open(path_prefix + ".mem.txt", "w") as f:
+                for stat in snapshot.statistics("lineno")[:top]:
+                    f.write(f"{stat}\n")
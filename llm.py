@@ -1,82 +1,132 @@
 from mirascope.core import openai, anthropic, prompt_template
-from pydantic import BaseModel, Field
 from dotenv import load_dotenv
 from enum import Enum
-load_dotenv()
-
-
-class Hypothesis(BaseModel):
-    hypothesis: str = Field(description="""A hypothesis about the rules of the game. The hypothesis must be complete and correct.
-The rules can be about any combination of:
-- Card colors (red/black)
-- Card ranks (Ace=1, 2-10 as numbers, J=11, Q=12, K=13)
-- Card suits (♥, ♦, ♣, ♠)
-- Relationships between consecutive cards
-
-The hypothesis must validate all the accepted plays in the game history.
+from typing import List
+import os
 
-Example: "After a heart, next card must be higher rank."
-""")
-
-class CardIndex(BaseModel):
-    index_of_card_to_play: int = Field(description="The index of the card to play, starting from 0.")
-
-class Action(BaseModel):
-    general_hypothesis: str = Field(description="""The most probable hypothesis about the rules of the game. Ensure you're hypothesis is coherent with the history of the game.
-The rules can be about any combination of:
-- Card colors (red/black)
-- Card ranks (Ace=1, 2-10 as numbers, J=11, Q=12, K=13)
-- Card suits (♥, ♦, ♣, ♠)
-- Relationships between consecutive cards
-The hypothesis must validate all the accepted plays in the game history.
-Example: "After a heart, next card must be higher rank.""")
-    card_index: int= Field(description="The index of the card to play, starting from 0")
+from schemas import Hypothesis, CardIndex, Action, Actions, HypothesisValidation, HypothesisValidations
+load_dotenv()
 
 
+def _prompt(static: str, dynamic: str) -> str:
+    """
+    Prompt template with a static SYSTEM prefix, marked as an Anthropic prompt-caching breakpoint,
+    followed by the USER message that changes on every call.
+    The calls extract their response model with a tool rather than json_mode, so the schema is sent
+    in the tool definitions at the start of the cached prefix instead of after the game state
+    """
+    return f"SYSTEM:\n{static}\n{{:cache_control}}\nUSER:\n{dynamic}"
 
 
-@anthropic.call("claude-3-5-haiku-latest", json_mode=True, response_model=Action)
-@prompt_template(
+PLAY_MODEL = "claude-3-5-haiku-latest"
+PLAY_INSTRUCTIONS = (
     "You ara a player of Eleusis."
     "Here are the rules of the game:"
     "{eleusis_rules}"
-    "This is the current state of the game:"
-    "{game_state}"
-    "The goal is to find the rule that can provide this mainline of valid plays."
+    "The goal is to find the rule that can provide the mainline of valid plays."
     "The rule must also validate all the invalid plays in the game history."
     "Of course, the rule is a general rule and can provide multiple mainline but with always the same logic."
     "The game is to find the correct hypothesis about the rules of the game."
 )
-def haiku_play(game_state: str, eleusis_rules: str = open("ELEUSIS_RULES.md").read()) -> Action:
+PLAY_PROMPT = _prompt(PLAY_INSTRUCTIONS, "This is the current state of the game:\n{game_state}")
+with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), "ELEUSIS_RULES.md")) as f:
+    ELEUSIS_RULES = f.read()
+
+@anthropic.call(PLAY_MODEL, response_model=Action)
+@prompt_template(PLAY_PROMPT)
+def haiku_play(game_state: str, eleusis_rules: str = ELEUSIS_RULES) -> Action:
     ...
 
+@anthropic.call(PLAY_MODEL, response_model=Action)
+@prompt_template(PLAY_PROMPT)
+async def haiku_play_async(game_state: str, eleusis_rules: str = ELEUSIS_RULES) -> Action:
+    ...
+
+
+BATCH_PLAY_PROMPT = _prompt(
+    "You are playing Eleusis for several players at once."
+    "Here are the rules of the game:"
+    "{eleusis_rules}"
+    "You are given game states, each the point of view of one player, numbered from 0."
+    "For each game state, in order, find the rule that can provide the mainline of valid plays"
+    " and validate all the invalid plays, and choose the card this player should play."
+    "Return exactly one action per game state.",
+    "{game_states}",
+)
+
+@anthropic.call(PLAY_MODEL, response_model=Actions)
+@prompt_template(BATCH_PLAY_PROMPT)
+def haiku_play_batch(game_states: str, eleusis_rules: str = ELEUSIS_RULES) -> Actions:
+    ...
 
 
-class HypothesisValidation(BaseModel):
-    is_valid: bool = Field(description="Whether the hypothesis is valid or not, only in case of CORRECT.")
-    reason: str = Field(description="""Can be: 
-- CORRECT if the hypothesis matches the rules exactly.
-- INCORRECT MAINLINE CONTRADICTION if the hypothesis contradicts the mainline of valid plays.
-- INCORRECT HISTORY CONTRADICTION if the hypothesis contradicts the history of invalid plays.
-- INCORRECT if the hypothesis is incorrect.
+def _numbered(blocks: List[str], title: str) -> str:
+    return "\n\n".join(f"=== {title} {i} ===\n{block}" for i, block in enumerate(blocks))
 
-for example: "Cards must alternate between red and black" and you see in the mainline two consecutive cards of the same color, then the reason is INCORRECT MAINLINE CONTRADICTION.
-""")
 
-@anthropic.call("claude-3-5-sonnet-latest", response_model=HypothesisValidation, json_mode=True)
-@prompt_template(
+def play_batch(perspectives: List[str]) -> Actions:
+    """Choose the actions of several players with a single LLM request"""
+    response = haiku_play_batch(_numbered(perspectives, "GAME STATE"))
+    if len(response.actions) != len(perspectives):
+        raise ValueError(f"Expected {len(perspectives)} actions, got {len(response.actions)}")
+    return response
+
+
+JUDGE_MODEL = "claude-3-5-sonnet-latest"
+# The rule is constant over a game, so it belongs to the cached prefix of the judge calls
+JUDGE_PROMPT = _prompt(
     "You are the judge of an Eleusis game."
     "You are given a hypothesis and the real rules of the game."
     "You need to determine if the hypothesis is valid or not."
-    "The hypothesis is: {hypothesis}"
-    "The real rules of the game are: {rule}"
-    "This is the current state of the game:"
-    "{game_state}"
     "You need to return True if the hypothesis is valid, False otherwise."
     "Check if the hypothesis is equivalent, complete and correct with the real rules of the game."
+    "The real rules of the game are: {rule}",
+    "The hypothesis is: {hypothesis}\n"
+    "This is the current state of the game:\n{game_state}",
 )
+
+@anthropic.call(JUDGE_MODEL, response_model=HypothesisValidation)
+@prompt_template(JUDGE_PROMPT)
 def test_hypothesis(hypothesis: str, rule: str, game_state: str) -> HypothesisValidation:
     ...
+
+@anthropic.call(JUDGE_MODEL, response_model=HypothesisValidation)
+@prompt_template(JUDGE_PROMPT)
+async def test_hypothesis_async(hypothesis: str, rule: str, game_state: str) -> HypothesisValidation:
+    ...
+
+
+BATCH_JUDGE_PROMPT = _prompt(
+    "You are the judge of an Eleusis game."
+    "You are given several hypotheses of the players and the real rules of the game."
+    "For each hypothesis, in order, determine if it is valid or not."
+    "Check if each hypothesis is equivalent, complete and correct with the real rules of the game."
+    "Return exactly one validation per hypothesis."
+    "The real rules of the game are: {rule}",
+    "The hypotheses are:\n{hypotheses}\n"
+    "This is the current state of the game:\n{game_state}",
+)
+
+@anthropic.call(JUDGE_MODEL, response_model=HypothesisValidations)
+@prompt_template(BATCH_JUDGE_PROMPT)
+def test_hypotheses(hypotheses: str, rule: str, game_state: str) -> HypothesisValidations:
+    ...
+
+
+def judge_batch(hypotheses: List[str], rule: str, game_state: str) -> HypothesisValidations:
+    """Validate the hypotheses of several players with a single LLM request"""
+    response = test_hypotheses(_numbered(hypotheses, "HYPOTHESIS"), rule, game_state)
+    if len(response.validations) != len(hypotheses):
+        raise ValueError(f"Expected {len(hypotheses)} validations, got {len(response.validations)}")
+    return response
+
+
+def cached_calls(cache) -> tuple:
+    """Return haiku_play and test_hypothesis wrapped by a cache.ResponseCache"""
+    return (
+        cache.wrap(haiku_play, PLAY_MODEL, PLAY_PROMPT, Action),
+        cache.wrap(test_hypothesis, JUDGE_MODEL, JUDGE_PROMPT, HypothesisValidation),
+    )
     
 if __name__ == "__main__":
     game_state = """=== ELEUSIS GAME STATE FOR Joueur Joueur_1 (7 cartes) ===
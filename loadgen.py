@@ -0,0 +1,121 @@
+from typing import List, Optional, Tuple
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+
+class Client:
+    """Keep-alive HTTP/1.1 client speaking the JSON API of server.py"""
+
+    def __init__(self, host: str, port: int, unix: Optional[str] = None):
+        self.host = host
+        self.port = port
+        self.unix = unix
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def connect(self):
+        if self.unix:
+            self.reader, self.writer = await asyncio.open_unix_connection(self.unix)
+        else:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method: str, path: str, body: Optional[dict] = None) -> Tuple[int, dict]:
+        data = json.dumps(body).encode("utf-8") if body is not None else b""
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data
+        )
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split(b" ", 2)[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.strip().lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    async def close(self):
+        self.writer.close()
+
+
+async def _worker(client: Client, args: argparse.Namespace, rng: random.Random, deadline: float,
+                  latencies: List[float], counts: dict):
+    """Play random cards on a table of its own, opening a new table whenever a game ends"""
+    await client.connect()
+    try:
+        while time.perf_counter() < deadline:
+            _, created = await client.request("POST", "/tables", {"players": args.players, "seed": rng.randrange(2 ** 31)})
+            table = created["table"]
+            for _ in range(args.players):
+                await client.request("POST", f"/tables/{table}/join", {})
+            hand_sizes, current = [7] * args.players, 0
+            for _ in range(args.max_turns):
+                if time.perf_counter() >= deadline:
+                    break
+                start = time.perf_counter()
+                status, result = await client.request(
+                    "POST", f"/tables/{table}/play", {"player": current, "card_index": rng.randrange(hand_sizes[current])})
+                latencies.append(time.perf_counter() - start)
+                counts["plays"] += 1
+                if status != 200:
+                    counts["errors"] += 1
+                    break
+                if result["game_over"]:
+                    break
+                hand_sizes, current = result["hand_sizes"], result["current_player"]
+            counts["tables"] += 1
+    finally:
+        await client.close()
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Drive the server with args.connections concurrent clients for args.duration seconds"""
+    rng = random.Random(args.seed)
+    latencies: List[float] = []
+    counts = {"plays": 0, "errors": 0, "tables": 0}
+    start = time.perf_counter()
+    deadline = start + args.duration
+    await asyncio.gather(*[
+        _worker(Client(args.host, args.port, args.unix), args, random.Random(rng.random()), deadline, latencies, counts)
+        for _ in range(args.connections)
+    ])
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "connections": args.connections,
+        "seconds": round(elapsed, 2),
+        "tables": counts["tables"],
+        "plays": counts["plays"],
+        "errors": counts["errors"],
+        "plays_per_second": round(counts["plays"] / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3) if latencies else None,
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 3) if latencies else None,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load generator for server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Connect to this Unix socket instead of TCP")
+    parser.add_argument("--connections", type=int, default=64, help="Concurrent clients, each playing its own table")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds of load")
+    parser.add_argument("--players", type=int, default=2)
+    parser.add_argument("--max-turns", type=int, default=200, help="Plays before a client moves to a new table")
+    parser.add_argument("--target", type=float, default=None, help="Exit with status 1 below this many plays per second")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if args.target is not None and report["plays_per_second"] < args.target:
+        print(f"Below target: {report['plays_per_second']} < {args.target} plays/s", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,281 @@
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+import math
+import random
+import time
+
+from cards import Card, NUM_CARDS
+from rules import RULES
+from schemas import Action, HypothesisValidation
+from solver import _bitset, _pair, parse_perspective, version_space
+from transitions import compile_rule
+
+
+@lru_cache(maxsize=None)
+def hypothesis_space(space: str) -> Tuple[Tuple[str, int, int], ...]:
+    """
+    Candidate hidden rules as (description, transition bitset, number of accepted pairs):
+    "rules" for the window-2 rules of rules.RULES, "grammar" for the version space of solver.py
+    """
+    if space == "rules":
+        candidates = []
+        for rule, description in RULES:
+            table = compile_rule(rule)
+            if table is not None:
+                bits = _bitset(table.table)
+                candidates.append((description, bits, bin(bits).count("1")))
+        return tuple(candidates)
+    if space == "grammar":
+        return tuple((str(expression), bits, size) for expression, bits, size in version_space())
+    raise ValueError(f"Unknown hypothesis space {space}, expected rules or grammar")
+
+
+def posterior(
+    space: str,
+    mainline: List[Card],
+    sidelines: List[Tuple[Card, Optional[Card]]],
+) -> Tuple[List[int], List[float]]:
+    """
+    Candidates consistent with the observed plays, with size-principle weights:
+    a rule accepting fewer pairs explains each accepted transition better
+    :return: (indices into hypothesis_space(space), normalized weights)
+    """
+    candidates = hypothesis_space(space)
+    accepted = 0
+    for prev, curr in zip(mainline, mainline[1:]):
+        accepted |= _pair(prev, curr)
+    rejected = 0
+    for card, prev in sidelines:
+        if prev is not None:
+            rejected |= _pair(prev, card)
+    survivors = [i for i, (_, bits, _) in enumerate(candidates) if bits & accepted == accepted and not bits & rejected]
+    if not survivors:
+        # Observations no candidate explains (e.g. a rule outside the space): fall back to the uniform prior
+        survivors = list(range(len(candidates)))
+        accepted = 0
+    observations = bin(accepted).count("1")
+    logs = [-observations * math.log(candidates[i][2] or 1) for i in survivors]
+    top = max(logs)
+    weights = [math.exp(log - top) for log in logs]
+    total = sum(weights)
+    return survivors, [weight / total for weight in weights]
+
+
+class _Node:
+    __slots__ = ("children", "visits", "value", "available")
+
+    def __init__(self):
+        self.children: Dict[int, "_Node"] = {}
+        self.visits = 0
+        self.value = 0.0
+        self.available = 0
+
+
+def search(
+    space: str,
+    hand: Tuple[int, ...],
+    last: Optional[int],
+    unseen: Tuple[int, ...],
+    survivors: List[int],
+    weights: List[float],
+    budget: float = 0.2,
+    iterations: Optional[int] = None,
+    horizon: int = 4,
+    info_weight: float = 1.0,
+    exploration: float = 1.4,
+    seed: Optional[int] = None,
+) -> Dict[int, Tuple[int, float]]:
+    """
+    Information set MCTS from the root state, all card codes. Every iteration samples a hidden rule from
+    the posterior and the order of the unseen cards, then plays up to `horizon` cards, choosing among the
+    cards held in that sample with UCB1. The reward is the hand size reduction plus info_weight times the
+    information gained, log2 of the reduction of the surviving candidates
+    :return: card code -> (visits, total reward) of the root children
+    """
+    rng = random.Random(seed)
+    candidates = hypothesis_space(space)
+    bits = [candidates[i][1] for i in survivors]
+    root = _Node()
+    deadline = time.perf_counter() + budget
+    done = 0
+
+    while (iterations is None or done < iterations) and (done == 0 or time.perf_counter() < deadline):
+        done += 1
+        rule = rng.choices(bits, weights)[0]
+        deck = list(unseen)
+        rng.shuffle(deck)
+        held = list(hand)
+        prev = last
+        alive = bits
+        node = root
+        path = [root]
+
+        for _ in range(horizon):
+            if not held:
+                break
+            if node is not None:
+                choices = set(held)
+                for code in choices:
+                    node.children.setdefault(code, _Node()).available += 1
+                untried = [code for code in choices if not node.children[code].visits]
+                if untried:
+                    # Expand one node per iteration, the rest of the future is a random rollout
+                    code = rng.choice(untried)
+                    path.append(node.children[code])
+                    node = None
+                else:
+                    code = max(choices, key=lambda c: node.children[c].value / node.children[c].visits
+                               + exploration * math.sqrt(math.log(node.children[c].available) / node.children[c].visits))
+                    node = node.children[code]
+                    path.append(node)
+            else:
+                code = rng.choice(held)
+
+            held.remove(code)
+            if prev is None:
+                prev = code
+            else:
+                pair = 1 << (prev * NUM_CARDS + code)
+                if rule & pair:
+                    alive = [candidate for candidate in alive if candidate & pair]
+                    prev = code
+                else:
+                    alive = [candidate for candidate in alive if not candidate & pair]
+                    held += deck[-2:]
+                    del deck[-2:]
+
+        reward = len(hand) - len(held) + info_weight * math.log2(len(bits) / len(alive))
+        for visited in path:
+            visited.visits += 1
+            visited.value += reward
+
+    return {code: (child.visits, child.value) for code, child in root.children.items()}
+
+
+def description_judge(hypothesis: str, rule: str, game_state: str) -> HypothesisValidation:
+    """
+    Local judge for EleusisLLM(judge_fn=...) when the planner states rules.RULES descriptions:
+    the rule DSL judges the descriptions it reads (all but one) before this is called,
+    the others are correct only when they are the secret rule's description
+    """
+    correct = hypothesis.strip() == rule.strip()
+    return HypothesisValidation(is_valid=correct, reason="CORRECT" if correct else "INCORRECT")
+
+
+def _search(args: tuple) -> Dict[int, Tuple[int, float]]:
+    return search(*args)
+
+
+class MCTSPlanner:
+    def __init__(
+        self,
+        space: str = "grammar",
+        budget: float = 0.2,
+        workers: int = 1,
+        horizon: int = 4,
+        info_weight: float = 1.0,
+        exploration: float = 1.4,
+        claim_threshold: float = 0.0,
+        seed: Optional[int] = None,
+    ):
+        """
+        Card selection by Monte Carlo tree search over the hidden rule, usable as LLM(MCTSPlanner()) in EleusisLLM
+        :param space: Candidate rules, "grammar" (the rule grammar of solver.py, whose hypotheses the rule DSL
+            judges exactly) or "rules" (rules.RULES, stated with their descriptions)
+        :param budget: Seconds of search per move
+        :param workers: Processes searching independent trees whose root statistics are merged (root parallelism)
+        :param horizon: Cards played by each simulated future
+        :param info_weight: Value of one bit of information about the rule, against one card less in hand
+        :param claim_threshold: Posterior probability the most probable rule needs to be stated as the hypothesis,
+            below it the hypothesis is empty, which EleusisLLM and tournament.py treat as no claim
+        """
+        hypothesis_space(space)
+        self.space = space
+        self.budget = budget
+        self.workers = workers
+        self.horizon = horizon
+        self.info_weight = info_weight
+        self.exploration = exploration
+        self.claim_threshold = claim_threshold
+        self.rng = random.Random(seed)
+        self._pool = None
+
+    def plan(
+        self,
+        hand: List[Card],
+        mainline: List[Card],
+        sidelines: List[Tuple[Card, Optional[Card]]],
+    ) -> Tuple[int, str, Dict[int, Tuple[int, float]]]:
+        """
+        Search from the observed state
+        :return: (index of the card to play in hand, hypothesis to state, merged root statistics by card code)
+        """
+        survivors, weights = posterior(self.space, mainline, sidelines)
+        top = max(range(len(survivors)), key=weights.__getitem__)
+        best = hypothesis_space(self.space)[survivors[top]][0] if weights[top] >= self.claim_threshold else ""
+        if len(set(hand)) < 2:
+            return 0, best, {}
+
+        # With a single deck, the cards that may still be drawn are those not seen anywhere
+        seen = {card.code for card in hand} | {card.code for card in mainline} | {card.code for card, _ in sidelines}
+        unseen = tuple(code for code in range(NUM_CARDS) if code not in seen)
+        args = [(self.space, tuple(card.code for card in hand), mainline[-1].code if mainline else None, unseen,
+                 survivors, weights, self.budget, None, self.horizon, self.info_weight, self.exploration,
+                 self.rng.randrange(2 ** 32)) for _ in range(self.workers)]
+        if self.workers > 1:
+            if self._pool is None:
+                from concurrent.futures import ProcessPoolExecutor
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            trees = list(self._pool.map(_search, args))
+        else:
+            trees = [search(*args[0])]
+
+        stats: Dict[int, Tuple[int, float]] = {}
+        for tree in trees:
+            for code, (visits, value) in tree.items():
+                total_visits, total_value = stats.get(code, (0, 0.0))
+                stats[code] = (total_visits + visits, total_value + value)
+        # The most visited card is the most robust choice
+        code = max(stats, key=lambda c: (stats[c][0], stats[c][1]))
+        return next(i for i, card in enumerate(hand) if card.code == code), best, stats
+
+    def choose(self, hand: List[Card], mainline: List[Card], sidelines: List[Tuple[Card, Optional[Card]]]) -> Action:
+        card_index, hypothesis, _ = self.plan(hand, mainline, sidelines)
+        return Action(general_hypothesis=hypothesis, card_index=card_index)
+
+    def __call__(self, perspective: str) -> Action:
+        hand, mainline, sidelines = parse_perspective(perspective)
+        return self.choose(hand, mainline, sidelines)
+
+    def close(self):
+        """Stop the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+
+if __name__ == "__main__":
+    import argparse
+    from eleusis import EleusisLLM, LLM
+
+    parser = argparse.ArgumentParser(description="Play a game with the MCTS planner")
+    parser.add_argument("--space", choices=["grammar", "rules"], default="grammar")
+    parser.add_argument("--budget", type=float, default=0.2, help="Seconds of search per move")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--claim-threshold", type=float, default=0.0, help="Posterior needed to state a rule")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    planner = MCTSPlanner(args.space, args.budget, args.workers, claim_threshold=args.claim_threshold, seed=args.seed)
+    # Judged locally: grammar hypotheses by the rule DSL, RULES descriptions by description_judge
+    game = EleusisLLM(LLM(planner), seed=args.seed, verbose=False, judge_fn=description_judge)
+    game.setup_round(0)
+    turns = 0
+    while not game.is_over() and turns < 200:
+        player = game.get_current_player()
+        action = game.llm.play(game._build_player_perspective(player))
+        entry = game._process_player_action(player, action)
+        turns += 1
+        print(f"{turns:3d} {entry.get('card_played', '-'):4s} {action.general_hypothesis} -> {entry['result']}")
+    planner.close()
+    print(f"Secret rule: {game.current_rule_description}")
@@ -0,0 +1,182 @@
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import itertools
+import random
+import time
+
+from eleusis import EleusisLLM, LLM, NO_CLAIM
+from hypothesis import check_hypothesis
+from schemas import Action, Actions, HypothesisValidation, HypothesisValidations
+
+
+AsyncPlayFn = Callable[[str], Awaitable[Action]]
+AsyncJudgeFn = Callable[[str, str, str], Awaitable[HypothesisValidation]]
+
+
+class TokenBucket:
+    """Token-bucket rate limiter: `rate` calls per second with bursts up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: float = 1.0):
+        """Wait until `tokens` tokens are available and take them"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class StubLLM:
+    """Local fake of the LLM calls, for running the orchestrator without network"""
+
+    def __init__(self, latency: float = 0.05, seed: int = 0):
+        self.latency = latency
+        self.rng = random.Random(seed)
+        self.calls = 0
+
+    async def play(self, perspective: str) -> Action:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return Action(general_hypothesis="Any card can be played", card_index=0)
+
+    async def judge(self, hypothesis: str, rule: str, game_state: str) -> HypothesisValidation:
+        self.calls += 1
+        await asyncio.sleep(self.latency)
+        return HypothesisValidation(is_valid=self.rng.random() < 0.05, reason="INCORRECT")
+
+    def play_batch(self, perspectives: List[str]) -> Actions:
+        """Offline batch submission: one simulated round-trip for all the perspectives"""
+        self.calls += 1
+        time.sleep(self.latency)
+        return Actions(actions=[Action(general_hypothesis="Any card can be played", card_index=0) for _ in perspectives])
+
+    def judge_batch(self, hypotheses: List[str], rule: str, game_state: str) -> HypothesisValidations:
+        self.calls += 1
+        time.sleep(self.latency)
+        return HypothesisValidations(validations=[
+            HypothesisValidation(is_valid=self.rng.random() < 0.05, reason="INCORRECT") for _ in hypotheses
+        ])
+
+
+class Orchestrator:
+    def __init__(
+        self,
+        play_fn: Optional[AsyncPlayFn] = None,
+        judge_fn: Optional[AsyncJudgeFn] = None,
+        max_concurrency: int = 8,
+        rate: float = 1.0,
+        burst: Optional[float] = None,
+        max_turns: int = 200,
+    ):
+        """
+        Run many EleusisLLM games concurrently against async LLM calls
+        :param play_fn: Async player call, perspective -> Action, defaults to llm.haiku_play_async
+        :param judge_fn: Async judge call, (hypothesis, rule, game_state) -> HypothesisValidation,
+            defaults to llm.test_hypothesis_async
+        :param max_concurrency: Maximum number of LLM calls in flight across all games
+        :param rate: Maximum LLM calls per second across all games
+        :param burst: Token-bucket capacity, defaults to rate
+        :param max_turns: Turn limit per game
+        """
+        if play_fn is None or judge_fn is None:
+            import llm
+            play_fn = play_fn or llm.haiku_play_async
+            judge_fn = judge_fn or llm.test_hypothesis_async
+        self.play_fn = play_fn
+        self.judge_fn = judge_fn
+        self.max_concurrency = max_concurrency
+        self.rate = rate
+        self.burst = burst
+        self.max_turns = max_turns
+        self.tasks: Dict[int, asyncio.Task] = {}
+        self.results: Dict[int, dict] = {}
+        self._ids = itertools.count()
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._bucket: Optional[TokenBucket] = None
+
+    async def _call(self, fn, *args):
+        """Call the LLM under the global concurrency and rate limits"""
+        await self._bucket.acquire()
+        async with self._semaphore:
+            return await fn(*args)
+
+    async def _run_game(self, game_id: int, game: EleusisLLM) -> dict:
+        result = {"game_id": game_id, "status": "running", "turns": 0, "history": []}
+        self.results[game_id] = result
+        try:
+            game.setup_round(0)
+            result["rule"] = game.current_rule_description
+            while not game.is_over() and result["turns"] < self.max_turns:
+                player = game.get_current_player()
+                perspective = game._build_player_perspective(player)
+                action = await self._call(self.play_fn, perspective)
+                history_entry = game._play_action_card(player, action)
+                if not action.general_hypothesis.strip():
+                    verdict = None, NO_CLAIM
+                else:
+                    verdict = check_hypothesis(action.general_hypothesis, game.current_rule, game.mainline, game.sidelines)
+                if verdict is None:
+                    response = await self._call(
+                        self.judge_fn, action.general_hypothesis, game.current_rule_description, game.get_game_state()
+                    )
+                    verdict = response.is_valid, response.reason
+                game._record_hypothesis_result(player, action, history_entry, *verdict)
+                result["history"].append(history_entry)
+                result["turns"] += 1
+            result["status"] = "finished" if game.is_over() else "turn_limit"
+        except asyncio.CancelledError:
+            result["status"] = "cancelled"
+            raise
+        except Exception as e:
+            result["status"] = "error"
+            result["error"] = repr(e)
+        finally:
+            result["scores"] = {str(p): s for p, s in game.scores.items()}
+        return result
+
+    def submit(self, seed: Optional[int] = None) -> int:
+        """Start a new game in the running event loop and return its id"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._bucket = TokenBucket(self.rate, self.burst)
+        game_id = next(self._ids)
+        game = EleusisLLM(LLM(self.play_fn), seed=seed, verbose=False)
+        self.tasks[game_id] = asyncio.create_task(self._run_game(game_id, game))
+        return game_id
+
+    def cancel(self, game_id: int) -> bool:
+        """Cancel a running game, return False if it already ended"""
+        task = self.tasks.get(game_id)
+        return task is not None and task.cancel()
+
+    async def wait(self) -> Dict[int, dict]:
+        """Wait for every submitted game and return the results by game id"""
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        return self.results
+
+    async def run(self, num_games: int, seed: int = 0) -> Dict[int, dict]:
+        """Play num_games games concurrently, game i seeded with seed + i"""
+        for i in range(num_games):
+            self.submit(seed + i)
+        return await self.wait()
+
+
+if __name__ == "__main__":
+    stub = StubLLM(latency=0.05)
+    orchestrator = Orchestrator(stub.play, stub.judge, max_concurrency=32, rate=200, max_turns=50)
+    start = time.perf_counter()
+    results = asyncio.run(orchestrator.run(50))
+    elapsed = time.perf_counter() - start
+    turns = sum(r["turns"] for r in results.values())
+    print(f"{len(results)} games, {turns} turns, {stub.calls} LLM calls in {elapsed:.2f}s "
+          f"({stub.calls / elapsed:.0f} calls/s)")
@@ -0,0 +1,114 @@
+from collections import Counter, deque
+from typing import List, Sequence, Tuple
+
+from cards import Card
+
+ARROW = " → "
+
+
+class PerspectiveRenderer:
+    def __init__(self, compact: bool = False, keep_recent: int = 10):
+        """
+        Append-only text buffers for the mainline, invalid plays and hypothesis history,
+        updated by EleusisGame.play_card instead of being rebuilt every turn
+        :param compact: Summarize the history older than keep_recent entries, so the text stays bounded
+        :param keep_recent: Number of recent mainline cards, invalid plays and hypotheses kept verbatim in compact mode
+        """
+        self.compact = compact
+        self.keep_recent = keep_recent
+        self.reset()
+
+    def reset(self):
+        self.mainline_text = ""
+        self.mainline_len = 0
+        self.last_card = None
+        # Compact mode: the last keep_recent mainline cards and the colors of the whole mainline
+        self.recent_cards = deque(maxlen=self.keep_recent)
+        self.colors = Counter()
+        # (card, mainline text at rejection, previous mainline card)
+        self.sidelines: List[Tuple[str, str, Card]] = []
+        self._sidelines_text = ""
+        self.hypotheses: List[List] = []  # [hypothesis, result, repeats]
+
+    def rebuild(self, mainline: Sequence[Card], sidelines: Sequence[Tuple[Card, Sequence[Card]]]):
+        """Resynchronize the buffers with a mainline and sidelines changed outside play_card"""
+        hypotheses = self.hypotheses
+        self.reset()
+        self.hypotheses = hypotheses
+        cards = list(mainline)
+        events = sorted(((len(history), i) for i, (_, history) in enumerate(sidelines)))
+        for length, i in events:
+            while self.mainline_len < length:
+                self.add_valid(cards[self.mainline_len])
+            self.add_invalid(sidelines[i][0])
+        while self.mainline_len < len(cards):
+            self.add_valid(cards[self.mainline_len])
+
+    def add_valid(self, card: Card):
+        self.mainline_len += 1
+        self.last_card = card
+        if self.compact:
+            # The full texts are never shown in compact mode, keep only what the summaries need
+            self.recent_cards.append(card)
+            self.colors[card.color] += 1
+            return
+        self.mainline_text = f"{self.mainline_text}{ARROW}{card}" if self.mainline_text else str(card)
+
+    def add_invalid(self, card: Card):
+        self.sidelines.append((str(card), self.mainline_text, self.last_card))
+        if self.compact:
+            return
+        line = f"  {card} was invalid when mainline was: {self.mainline_text}"
+        self._sidelines_text = f"{self._sidelines_text}\n{line}" if self._sidelines_text else line
+
+    def add_hypothesis(self, hypothesis: str, result: str):
+        last = self.hypotheses[-1] if self.hypotheses else None
+        if self.compact and last is not None and last[0] == hypothesis and last[1] == result:
+            last[2] += 1
+        else:
+            self.hypotheses.append([hypothesis, result, 1])
+
+    def mainline(self) -> str:
+        if not self.compact:
+            return self.mainline_text or "Empty"
+        if not self.mainline_len:
+            return "Empty"
+        recent = ARROW.join(str(card) for card in self.recent_cards)
+        older = self.mainline_len - len(self.recent_cards)
+        if not older:
+            return recent
+        colors = self.colors - Counter(card.color for card in self.recent_cards)
+        return f"[{older} earlier cards: {colors['red']} red, {colors['black']} black]{ARROW}{recent}"
+
+    def sidelines_text(self) -> str:
+        if not self.sidelines:
+            return "None"
+        if not self.compact:
+            return self._sidelines_text
+
+        older = self.sidelines[:-self.keep_recent] if len(self.sidelines) > self.keep_recent else []
+        recent = self.sidelines[len(older):]
+        lines = []
+        if older:
+            transitions = Counter(
+                (previous.color if previous is not None else "start", card[-1]) for card, _, previous in older
+            )
+            summary = ", ".join(f"{card_suit} after {color} ×{count}" for (color, card_suit), count in sorted(transitions.items()))
+            lines.append(f"  {len(older)} earlier invalid plays (suit after previous card color): {summary}")
+        for card, _, previous in recent:
+            lines.append(f"  {card} was invalid after {previous}" if previous is not None else f"  {card} was invalid as first card")
+        return "\n".join(lines)
+
+    def hypotheses_text(self) -> str:
+        entries = self.hypotheses
+        lines = []
+        if self.compact and len(entries) > self.keep_recent:
+            omitted = entries[:-self.keep_recent]
+            results = Counter(result for _, result, _ in omitted)
+            lines.append(f"{sum(r for _, _, r in omitted)} earlier hypotheses: "
+                         + ", ".join(f"{result} ×{count}" for result, count in results.items()) + "\n")
+            entries = entries[-self.keep_recent:]
+        for hypothesis, result, repeats in entries:
+            suffix = f" ×{repeats}" if repeats > 1 else ""
+            lines.append(f"{hypothesis} ({result}){suffix}\n")
+        return "".join(lines)
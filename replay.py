@@ -0,0 +1,283 @@
+from bisect import bisect_right
+from typing import Dict, List, Optional
+import json
+import mmap
+import os
+import re
+import struct
+
+from cards import Card, Mainline
+from eleusis import EleusisGame, GamePhase
+from history import HistoryReader, _Buffer, _decode_cards
+import history
+from rules import RULES
+
+INDEX_MAGIC = b"ELIX"
+INDEX_VERSION = 1
+_HEADER = struct.Struct("<4sBQ")     # magic, version, indexed log size
+_RECORD = struct.Struct("<QIbBB")    # offset, length, card code (-1 if none), player index, flags
+
+ACCEPTED = 1
+HAS_VALIDITY = 2
+WAS_VALID = 4
+
+_PLAYER_NAME = re.compile(r"Joueur (\S+) \(")
+
+
+def _player_index(player: str) -> int:
+    """Index of a player from its string, e.g. "Joueur Joueur_2 (7 cartes)" -> 1"""
+    match = _PLAYER_NAME.match(player)
+    name = match.group(1) if match else player
+    return int(name.rsplit("_", 1)[-1]) - 1 if name.rsplit("_", 1)[-1].isdigit() else 0
+
+
+def _accepted(was_valid: Optional[bool], logged_len: int, accepted: int) -> bool:
+    """
+    Whether a play joined the mainline, from its own verdict: batched rounds log the mainline at the end
+    of the round. A play ending the game has none, its logged mainline is then the final one
+    """
+    if was_valid is None:
+        return logged_len == accepted + 1
+    return bool(was_valid)
+
+
+class ReplayLog:
+    def __init__(self, path: str):
+        """
+        Random access to a game history written by EleusisLLM.make_game through a memory map of the log.
+        JSONL logs keep a sidecar offset index (path + ".idx"); binary logs (history.py) are indexed
+        by a pass over their record headers, keeping the string table and card deltas each turn decodes with.
+        An incomplete last record, from an interrupted run, is left out until it is complete
+        """
+        self.path = path
+        self.index_path = path + ".idx"
+        self.records: List[tuple] = []
+        self._file = open(path, "rb")
+        self._map: Optional[mmap.mmap] = None
+        self.binary = self._file.read(len(history.MAGIC)) == history.MAGIC
+        # Binary logs: (strings, mainline codes, mainline length, last card) before each turn
+        self._contexts: List[tuple] = []
+        if self.binary:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._index_binary()
+        else:
+            self._load_index()
+        self._build_lookups()
+
+    def _index_binary(self):
+        data = self._map
+        if data[len(history.MAGIC)] != history.VERSION:
+            raise ValueError(f"Unsupported history version {data[len(history.MAGIC)]}")
+        buffer = _Buffer(data)
+        buffer.position = len(history.MAGIC) + 1
+        strings: List[Optional[str]] = [None]
+        mainline: List[int] = []
+        last_card = 0
+        accepted = 0
+        while buffer.position < len(data):
+            try:
+                length = buffer.varint()
+            except IndexError:
+                break
+            start, end = buffer.position, buffer.position + length
+            if end > len(data):
+                break
+            kind = data[start]
+            buffer.position = start + 1
+            if kind == history.STRING:
+                strings.append(data[start + 1:end].decode("utf-8"))
+            elif kind == history.RESET:
+                strings, mainline, last_card = [None], [], 0
+            elif kind == history.MAINLINE:
+                mainline = _decode_cards(buffer)
+            elif kind == history.TURN:
+                self._contexts.append((strings, mainline, len(mainline), last_card))
+                buffer.varint()
+                log_flags = data[buffer.position]
+                buffer.position += 1
+                card = -1
+                if log_flags & history.HAS_CARD:
+                    card = last_card = last_card + buffer.signed()
+                if log_flags & history.ACCEPTED:
+                    mainline.append(card)
+                flags = 0
+                if log_flags & history.HAS_CARD and _accepted(log_flags & history.WAS_VALID if not log_flags & history.GAME_OVER
+                                                              else None, len(mainline), accepted):
+                    flags |= ACCEPTED
+                    accepted += 1
+                if log_flags & history.HAS_CARD and not log_flags & history.GAME_OVER:
+                    flags |= HAS_VALIDITY | (WAS_VALID if log_flags & history.WAS_VALID else 0)
+                buffer.double()
+                player = strings[buffer.varint()] or ""
+                self.records.append((start + 1, end - start - 1, card, _player_index(player), flags))
+            buffer.position = end
+
+    def _build_lookups(self):
+        """Per-record mainline lengths, each player's turns and the rejected plays, for game_at"""
+        self._accepted: List[int] = []
+        self._mainline_len: List[int] = []
+        self._positions: Dict[int, List[int]] = {}
+        self._rejected: List[int] = []
+        length = 0
+        for position, (_, _, card, player, flags) in enumerate(self.records):
+            if flags & ACCEPTED:
+                self._accepted.append(card)
+                length += 1
+            elif card >= 0:
+                self._rejected.append(position)
+            self._mainline_len.append(length)
+            self._positions.setdefault(player, []).append(position)
+
+    def _load_index(self):
+        size = os.path.getsize(self.path)
+        indexed = 0
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "rb") as f:
+                data = f.read()
+            if len(data) >= _HEADER.size:
+                magic, version, indexed = _HEADER.unpack_from(data)
+                if magic == INDEX_MAGIC and version == INDEX_VERSION and indexed <= size:
+                    self.records = [r for r in _RECORD.iter_unpack(data[_HEADER.size:])]
+                else:
+                    indexed = 0
+        if indexed < size:
+            self._extend_index(indexed, size)
+        if size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _extend_index(self, start: int, size: int):
+        """Index the log from byte `start`, e.g. after new turns were appended"""
+        if start == 0:
+            self.records = []
+        mainline_len = accepted = len(self.mainline_codes(len(self.records)))
+        self._file.seek(start)
+        offset = start
+        for line in self._file:
+            if line.strip():
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    if line.endswith(b"\n"):
+                        raise
+                    # Last line cut short by an interrupted run: indexed once it is complete
+                    break
+                card = Card.parse(entry["card_played"]).code if "card_played" in entry else -1
+                flags = 0
+                new_len = len(entry.get("game_state", {}).get("mainline", []))
+                if card >= 0 and (_accepted(entry["was_valid"], new_len, accepted) if "was_valid" in entry
+                                  else new_len == mainline_len + 1):
+                    flags |= ACCEPTED
+                    accepted += 1
+                mainline_len = new_len
+                if "was_valid" in entry and entry["was_valid"] is not None:
+                    flags |= HAS_VALIDITY | (WAS_VALID if entry["was_valid"] else 0)
+                self.records.append((offset, len(line), card, _player_index(entry["player"]), flags))
+            offset += len(line)
+        with open(self.index_path, "wb") as f:
+            f.write(_HEADER.pack(INDEX_MAGIC, INDEX_VERSION, offset))
+            for record in self.records:
+                f.write(_RECORD.pack(*record))
+
+    def __len__(self):
+        return len(self.records)
+
+    def entry(self, turn: int) -> dict:
+        """Return the history entry of a turn, with a single seek into the log"""
+        offset, length, _, _, _ = self.records[turn]
+        if self.binary:
+            strings, mainline, mainline_len, last_card = self._contexts[turn]
+            buffer = _Buffer(self._map)
+            buffer.position = offset
+            return HistoryReader._decode_turn(buffer, strings, mainline[:mainline_len], last_card)[0]
+        return json.loads(self._map[offset:offset + length])
+
+    def mainline_codes(self, turn: int) -> List[int]:
+        """Card codes of the mainline after `turn` turns, from the index alone"""
+        return [card for _, _, card, _, flags in self.records[:turn] if flags & ACCEPTED]
+
+    def game_at(self, turn: int) -> EleusisGame:
+        """
+        Rebuild the EleusisGame state right after the given turn without replaying the turns before it:
+        the mainline and invalid plays from the in-memory index, hands and scores from the game_state
+        of the latest entries (logged at the end of the round in batched games)
+        """
+        if turn < 0:
+            turn += len(self.records)
+        entry = self.entry(turn)
+        num_players = max(self._positions) + 1
+        game = EleusisGame(num_players, verbose=False)
+        game.terminate()
+        game.prophet = game.table.players[0]
+        game.current_rule, game.current_rule_description = self.rule()
+
+        state = entry.get("game_state", {})
+        mainline = Mainline.from_codes(self._accepted[:self._mainline_len[turn]])
+        for position in self._rejected[:bisect_right(self._rejected, turn)]:
+            game.sidelines.append((Card.from_code(self.records[position][2]), mainline.view(self._mainline_len[position])))
+        game.mainline = mainline
+
+        # Each player's hand comes from their latest entry, the scores from this one
+        for player_idx, positions in self._positions.items():
+            latest = bisect_right(positions, turn) - 1
+            if latest < 0:
+                continue
+            player_state = state if positions[latest] == turn else self.entry(positions[latest]).get("game_state", {})
+            player = game.table.players[player_idx]
+            for card in player_state.get("current_player_hand", []):
+                player.add_card(Card.parse(card))
+        for name, score in state.get("scores", {}).items():
+            game.scores[game.table.players[_player_index(name)]] = score
+
+        game.history = [{"turn": i} for i in range(turn + 1)]
+        game.current_player_idx = (self.records[turn][3] + (1 if self.records[turn][4] & ACCEPTED else 0)) % num_players
+        if entry.get("hypothesis_valid") or entry.get("result") == "game_over":
+            game.phase = GamePhase.SCORING
+        return game
+
+    def rule(self):
+        """Return the (rule, description) from rules.RULES recorded in the log"""
+        description = self.entry(0)["rule"]
+        for rule, rule_description in RULES:
+            if rule_description == description:
+                return rule, rule_description
+        raise ValueError(f"Unknown rule {description!r}")
+
+    def verify(self) -> List[str]:
+        """Re-run the rule on every play, return a description of each inconsistency"""
+        rule, _ = self.rule()
+        problems = []
+        mainline: List[Card] = []
+        for turn, (_, _, card, _, flags) in enumerate(self.records):
+            if card < 0:
+                continue
+            played = Card.from_code(card)
+            expected = rule(mainline + [played])
+            accepted = bool(flags & ACCEPTED)
+            if expected != accepted:
+                problems.append(f"turn {turn}: {played} was {'accepted' if accepted else 'rejected'} "
+                                f"but the rule {'accepts' if expected else 'rejects'} it")
+            if flags & HAS_VALIDITY and bool(flags & WAS_VALID) != accepted:
+                problems.append(f"turn {turn}: was_valid does not match the mainline")
+            if accepted:
+                mainline.append(played)
+        return problems
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == "__main__":
+    import sys
+    with ReplayLog(sys.argv[1]) as log:
+        turn = int(sys.argv[2]) if len(sys.argv) > 2 else len(log) - 1
+        print(log.game_at(turn).get_game_state())
+        problems = log.verify()
+        print("\n".join(problems) if problems else f"{len(log)} turns consistent with the rule")
@@ -1,7 +1,16 @@
-from typing import List, Callable
-from cards import Card
+from abc import ABC, abstractmethod
+from typing import Any, List, Callable, Optional, Sequence
+from cards import Card, Suit, IS_FACE, IS_NUMERAL, RANK_VALUE
 import random
 
+def window(size: int):
+    """Declare how many trailing cards of the mainline a rule looks at"""
+    def decorator(rule):
+        rule.window = size
+        return rule
+    return decorator
+
+@window(2)
 def alternate_colors(cards: List[Card]) -> bool:
     """Rule 1: Cards must alternate between red and black"""
     if not cards or len(cards) == 1:
@@ -9,12 +18,14 @@ def alternate_colors(cards: List[Card]) -> bool:
     return cards[-1].color != cards[-2].color
 
 
+@window(2)
 def same_suit_or_rank(cards: List[Card]) -> bool:
     """Rule 3: Each card must share either suit or rank with the previous card"""
     if not cards or len(cards) == 1:
         return True
     return cards[-1].suit == cards[-2].suit or cards[-1].rank == cards[-2].rank
 
+@window(2)
 def odd_even_alternating(cards: List[Card]) -> bool:
     """Rule 4: Cards must alternate between odd and even ranks"""
     if not cards or len(cards) == 1:
@@ -23,34 +34,39 @@ def odd_even_alternating(cards: List[Card]) -> bool:
     curr_is_odd = cards[-1].rank_value() % 2 == 1
     return prev_is_odd != curr_is_odd
 
+@window(2)
 def red_after_face(cards: List[Card]) -> bool:
     """Rule 5: After a face card (J,Q,K), must play a red card"""
     if not cards or len(cards) == 1:
         return True
-    prev_is_face = isinstance(cards[-2].rank, str)
+    prev_is_face = bool(IS_FACE[cards[-2].code])
     return not prev_is_face or (prev_is_face and cards[-1].color == "red")
 
+@window(2)
 def sum_under_15(cards: List[Card]) -> bool:
     """Rule 6: Sum of consecutive card values must be under 15"""
     if not cards or len(cards) == 1:
         return True
-    return (cards[-2].rank_value() + cards[-1].rank_value()) <= 15
+    return (cards[-2].rank_value() + cards[-1].rank_value()) < 15
 
+@window(2)
 def same_color_as_prev_suit(cards: List[Card]) -> bool:
     """Rule 7: Card color must match the color of the previous card's suit"""
     if not cards or len(cards) == 1:
         return True
-    prev_suit_color = "red" if cards[-2].suit in ["♥", "♦"] else "black"
+    prev_suit_color = "red" if cards[-2].suit in [Suit.HEARTS, Suit.DIAMONDS] else "black"
     return cards[-1].color == prev_suit_color
 
+@window(2)
 def higher_after_hearts(cards: List[Card]) -> bool:
     """Rule 8: After a heart, next card must be higher rank"""
     if not cards or len(cards) == 1:
         return True
-    if cards[-2].suit == "♥":
+    if cards[-2].suit == Suit.HEARTS:
         return cards[-1].rank_value() > cards[-2].rank_value()
     return True
 
+@window(2)
 def black_after_even(cards: List[Card]) -> bool:
     """Rule 9: After an even rank, must play a black card"""
     if not cards or len(cards) == 1:
@@ -58,12 +74,13 @@ def black_after_even(cards: List[Card]) -> bool:
     prev_is_even = cards[-2].rank_value() % 2 == 0
     return not prev_is_even or (prev_is_even and cards[-1].color == "black")
 
+@window(2)
 def no_consecutive_faces(cards: List[Card]) -> bool:
     """Rule 10: Cannot play two face cards in a row"""
     if not cards or len(cards) == 1:
         return True
-    prev_is_face = isinstance(cards[-2].rank, str)
-    curr_is_face = isinstance(cards[-1].rank, str)
+    prev_is_face = IS_FACE[cards[-2].code]
+    curr_is_face = IS_FACE[cards[-1].code]
     return not (prev_is_face and curr_is_face)
 
 # List of all rules with their descriptions
@@ -79,6 +96,151 @@ RULES = [
     (no_consecutive_faces, "Cannot play two face cards in a row")
 ]
 
-def get_random_rule() -> tuple[Callable[[List[Card]], bool], str]:
-    """Returns a random rule function and its description"""
-    return random.choice(RULES)
\ No newline at end of file
+
+class Rule(ABC):
+    """
+    Incremental rule: the mainline is summarized by a state, so a play is checked with
+    accepts(state, card) and the state updated with advance(state, card) once the card is accepted,
+    without re-reading the mainline
+    """
+    # Number of trailing mainline cards (including the played card) the rule looks at, None for global state
+    window: Optional[int] = None
+
+    def initial_state(self) -> Any:
+        return None
+
+    @abstractmethod
+    def accepts(self, state: Any, card: Card) -> bool:
+        ...
+
+    def advance(self, state: Any, card: Card) -> Any:
+        return state
+
+    def state_of(self, mainline: Sequence[Card]) -> Any:
+        """Replay a mainline to get its state"""
+        state = self.initial_state()
+        for card in mainline:
+            state = self.advance(state, card)
+        return state
+
+    def __call__(self, cards: List[Card]) -> bool:
+        """Same signature as the rule functions: is the last card valid after the others"""
+        if not cards:
+            return True
+        return self.accepts(self.state_of(cards[:-1]), cards[-1])
+
+
+class WindowRule(Rule):
+    def __init__(self, fn: Callable[[List[Card]], bool], size: Optional[int]):
+        """
+        Incremental form of a rule function looking at its last `size` cards
+        :param size: Window of the function, None if it may look at the whole mainline
+        """
+        self.fn = fn
+        self.window = size
+        self.__name__ = fn.__name__
+        self.__doc__ = fn.__doc__
+
+    def initial_state(self):
+        # Last size - 1 accepted cards, or every accepted card without a window
+        return () if self.window is not None else []
+
+    def accepts(self, state, card):
+        if self.window is None:
+            state.append(card)
+            try:
+                return self.fn(state)
+            finally:
+                state.pop()
+        return self.fn([*state, card])
+
+    def advance(self, state, card):
+        if self.window is None:
+            state.append(card)
+            return state
+        return (*state, card)[1 - self.window:] if self.window > 1 else ()
+
+
+def as_rule(rule: Callable[[List[Card]], bool]) -> Rule:
+    """Return the incremental form of a rule function, from its declared window"""
+    if isinstance(rule, Rule):
+        return rule
+    return WindowRule(rule, getattr(rule, "window", None))
+
+
+@window(2)
+def black_after_odd(cards: List[Card]) -> bool:
+    """If the last card was odd, play a black card; if even, play a red card"""
+    if not cards or len(cards) == 1:
+        return True
+    prev_is_odd = cards[-2].rank_value() % 2 == 1
+    return cards[-1].color == ("black" if prev_is_odd else "red")
+
+@window(3)
+def high_after_matching_colors(cards: List[Card]) -> bool:
+    """If the last two cards match in colour, play a high number (8 or more); otherwise, play a low number"""
+    if len(cards) < 3:
+        return True
+    high = cards[-1].rank_value() >= 8
+    return high if cards[-2].color == cards[-3].color else not high
+
+@window(2)
+def higher_until_face(cards: List[Card]) -> bool:
+    """Each card must be higher than the last one until a face card is reached, which must then be followed by a numeral"""
+    if not cards or len(cards) == 1:
+        return True
+    if IS_FACE[cards[-2].code]:
+        return bool(IS_NUMERAL[cards[-1].code])
+    return cards[-1].rank_value() > cards[-2].rank_value()
+
+
+class AboveRunningTotal(Rule):
+    """Each card must be higher than the running total of the mainline modulo 13"""
+
+    def initial_state(self):
+        return 0
+
+    def accepts(self, state, card):
+        return RANK_VALUE[card.code] > state
+
+    def advance(self, state, card):
+        return (state + RANK_VALUE[card.code]) % 13
+
+
+class FaceWithin(Rule):
+    def __init__(self, limit: int = 4):
+        """
+        A face card (J,Q,K) must be played at most `limit` cards after the previous one
+        :param limit: Maximum count of cards since the last face card
+        """
+        self.limit = limit
+        self.__name__ = f"face_within_{limit}"
+
+    def initial_state(self):
+        # Number of cards since the last face card
+        return 0
+
+    def accepts(self, state, card):
+        return state < self.limit - 1 or bool(IS_FACE[card.code])
+
+    def advance(self, state, card):
+        return 0 if IS_FACE[card.code] else state + 1
+
+
+# Longer-window and stateful rules from ELEUSIS_RULES.md, not drawn by get_random_rule
+EXTENDED_RULES = [
+    (black_after_odd, "If the last card was odd, play a black card; if even, play a red card"),
+    (high_after_matching_colors, "If the last two cards match in colour, play a high number (8 or more); otherwise, play a low number"),
+    (higher_until_face, "Each card must be higher than the last mainline card until a face card is reached, which must then be followed by a numeral card"),
+    (AboveRunningTotal(), "Each card must be higher than the running total of the mainline modulo 13"),
+    (FaceWithin(4), "A face card must be played at least every 4 cards"),
+]
+
+def get_random_rule(rng: random.Random = None, weights: Optional[Sequence[float]] = None) -> tuple[Callable[[List[Card]], bool], str]:
+    """
+    Returns a random rule function and its description
+    :param weights: Relative weight of each rule of RULES, e.g. from analysis.py; uniform if they are all zero
+    """
+    if weights is None or not any(weights):
+        return (rng or random).choice(RULES)
+    return (rng or random).choices(RULES, weights=weights)[0]
\ No newline at end of file
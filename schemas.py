@@ -0,0 +1,48 @@
+from typing import List
+
+from pydantic import BaseModel, Field
+
+
+class Hypothesis(BaseModel):
+    hypothesis: str = Field(description="""A hypothesis about the rules of the game. The hypothesis must be complete and correct.
+The rules can be about any combination of:
+- Card colors (red/black)
+- Card ranks (Ace=1, 2-10 as numbers, J=11, Q=12, K=13)
+- Card suits (♥, ♦, ♣, ♠)
+- Relationships between consecutive cards
+
+The hypothesis must validate all the accepted plays in the game history.
+
+Example: "After a heart, next card must be higher rank."
+""")
+
+class CardIndex(BaseModel):
+    index_of_card_to_play: int = Field(description="The index of the card to play, starting from 0.")
+
+class Action(BaseModel):
+    general_hypothesis: str = Field(description="""The most probable hypothesis about the rules of the game. Ensure you're hypothesis is coherent with the history of the game.
+The rules can be about any combination of:
+- Card colors (red/black)
+- Card ranks (Ace=1, 2-10 as numbers, J=11, Q=12, K=13)
+- Card suits (♥, ♦, ♣, ♠)
+- Relationships between consecutive cards
+The hypothesis must validate all the accepted plays in the game history.
+Example: "After a heart, next card must be higher rank.""")
+    card_index: int= Field(description="The index of the card to play, starting from 0")
+
+class Actions(BaseModel):
+    actions: List[Action] = Field(description="One action per game state, in the order the game states are given")
+
+class HypothesisValidation(BaseModel):
+    is_valid: bool = Field(description="Whether the hypothesis is valid or not, only in case of CORRECT.")
+    reason: str = Field(description="""Can be: 
+- CORRECT if the hypothesis matches the rules exactly.
+- INCORRECT MAINLINE CONTRADICTION if the hypothesis contradicts the mainline of valid plays.
+- INCORRECT HISTORY CONTRADICTION if the hypothesis contradicts the history of invalid plays.
+- INCORRECT if the hypothesis is incorrect.
+
+for example: "Cards must alternate between red and black" and you see in the mainline two consecutive cards of the same color, then the reason is INCORRECT MAINLINE CONTRADICTION.
+""")
+
+class HypothesisValidations(BaseModel):
+    validations: List[HypothesisValidation] = Field(description="One validation per hypothesis, in the order the hypotheses are given")
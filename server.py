@@ -0,0 +1,308 @@
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import asyncio
+import json
+import os
+import struct
+import time
+import uuid
+
+from cards import Card
+from eleusis import EleusisGame, GamePhase
+from hypothesis import check_hypothesis
+from rules import RULES
+import snapshot
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+            409: "Conflict", 500: "Internal Server Error"}
+
+
+class Table:
+    """A hosted game, its seats and the lock serializing its requests"""
+
+    def __init__(self, game: EleusisGame):
+        self.game = game
+        self.seats: Dict[int, str] = {}
+        self.lock = asyncio.Lock()
+        self.last_used = time.monotonic()
+
+
+class GameServer:
+    def __init__(self, state_dir: str = "./tables", idle_seconds: float = 300.0, executor: Optional[Executor] = None):
+        """
+        Hosts many EleusisGame instances keyed by table id
+        :param state_dir: Where idle tables are written when evicted from memory
+        :param idle_seconds: Inactivity after which a table is evicted
+        :param executor: Pool shared by every table for hypothesis validation and disk I/O
+        """
+        self.state_dir = state_dir
+        self.idle_seconds = idle_seconds
+        self.executor = executor or ThreadPoolExecutor(max_workers=os.cpu_count())
+        self.tables: Dict[str, Table] = {}
+        self._loading: Dict[str, asyncio.Future] = {}
+        self.requests = 0
+        os.makedirs(state_dir, exist_ok=True)
+
+    # Tables
+
+    def _path(self, table_id: str) -> str:
+        return os.path.join(self.state_dir, f"{table_id}.snap")
+
+    async def _table(self, table_id: str) -> Table:
+        """Return a table, loading it back from disk if it was evicted"""
+        if not table_id.isalnum():
+            raise HTTPError(404, f"Unknown table {table_id}")
+        table = self.tables.get(table_id)
+        if table is None:
+            if table_id not in self._loading:
+                if not os.path.exists(self._path(table_id)):
+                    raise HTTPError(404, f"Unknown table {table_id}")
+                self._loading[table_id] = asyncio.get_running_loop().run_in_executor(self.executor, self._load, table_id)
+            try:
+                table = await self._loading[table_id]
+            finally:
+                self._loading.pop(table_id, None)
+            self.tables.setdefault(table_id, table)
+            table = self.tables[table_id]
+        table.last_used = time.monotonic()
+        return table
+
+    def _load(self, table_id: str) -> Table:
+        with open(self._path(table_id), "rb") as f:
+            data = f.read()
+        length, = struct.unpack_from("<I", data)
+        table = Table(snapshot.loads(data[4 + length:]))
+        table.seats = {int(seat): name for seat, name in json.loads(data[4:4 + length]).items()}
+        # Only once restored: a corrupt or unsupported snapshot stays on disk
+        os.remove(self._path(table_id))
+        return table
+
+    def _save(self, table_id: str, table: Table):
+        """Seats as length-prefixed JSON, then the game snapshot without its turn history"""
+        seats = json.dumps(table.seats).encode("utf-8")
+        with open(self._path(table_id), "wb") as f:
+            f.write(struct.pack("<I", len(seats)) + seats + snapshot.dumps(table.game, history=False))
+
+    async def evict_idle(self) -> int:
+        """Write the tables idle for more than idle_seconds to disk and drop them from memory"""
+        now = time.monotonic()
+        idle = [table_id for table_id, table in self.tables.items()
+                if now - table.last_used > self.idle_seconds and not table.lock.locked()]
+        loop = asyncio.get_running_loop()
+        evicted = 0
+        for table_id in idle:
+            table = self.tables[table_id]
+            async with table.lock:
+                # A request may have fetched the table while we waited for its lock
+                if time.monotonic() - table.last_used <= self.idle_seconds:
+                    continue
+                await loop.run_in_executor(self.executor, self._save, table_id, table)
+                del self.tables[table_id]
+                evicted += 1
+        return evicted
+
+    async def _evict_forever(self):
+        while True:
+            await asyncio.sleep(max(self.idle_seconds / 2, 1.0))
+            await self.evict_idle()
+
+    # Endpoints
+
+    async def create(self, body: dict) -> Tuple[int, dict]:
+        num_players = body.get("players", 2)
+        if not isinstance(num_players, int) or isinstance(num_players, bool) or num_players < 1:
+            raise HTTPError(400, "players must be a positive integer")
+        game = EleusisGame(num_players, seed=body.get("seed"), verbose=False)
+        game.setup_round(0)
+        if "rule" in body:
+            rule = int(body["rule"])
+            if rule not in range(len(RULES)):
+                raise HTTPError(400, f"Rule must be between 0 and {len(RULES) - 1}")
+            game.current_rule, game.current_rule_description = RULES[rule]
+        # Unique across restarts, so a new table never hides one evicted by a previous run
+        table_id = uuid.uuid4().hex
+        self.tables[table_id] = Table(game)
+        return 201, {"table": table_id, "players": num_players}
+
+    async def join(self, table: Table, body: dict) -> Tuple[int, dict]:
+        free = [i for i in range(len(table.game.table.players)) if i not in table.seats]
+        if not free:
+            raise HTTPError(409, "Table is full")
+        table.seats[free[0]] = str(body.get("name", f"player_{free[0]}"))
+        return 200, {"player": free[0]}
+
+    def _player(self, table: Table, body: dict):
+        index = body.get("player")
+        if not isinstance(index, int) or index not in table.seats:
+            raise HTTPError(400, "Unknown player, join the table first")
+        return index, table.game.table.players[index]
+
+    def _summary(self, game: EleusisGame) -> dict:
+        return {
+            "current_player": game.current_player_idx,
+            "hand_sizes": [len(player.hand) for player in game.table.players],
+            "mainline_length": len(game.mainline),
+            "game_over": game.is_over() or game.phase == GamePhase.SCORING,
+        }
+
+    async def play(self, table: Table, body: dict) -> Tuple[int, dict]:
+        game = table.game
+        index, player = self._player(table, body)
+        if game.is_over() or game.phase == GamePhase.SCORING:
+            raise HTTPError(409, "Game is over")
+        if index != game.current_player_idx:
+            raise HTTPError(409, f"Not your turn, player {game.current_player_idx} is playing")
+        try:
+            card = Card.parse(body["card"]) if "card" in body else player.hand[int(body["card_index"])]
+        except (KeyError, IndexError, ValueError):
+            raise HTTPError(400, "Give a card from your hand as card or card_index")
+        if not player.has_card(card):
+            raise HTTPError(400, f"{card} is not in your hand")
+        # A transition table lookup or an incremental rule step, far cheaper than a hop to the shared pool
+        valid = game.play_card(player, card)
+        return 200, dict(card=str(card), valid=valid is not False, **self._summary(game))
+
+    async def state(self, table: Table, query: dict) -> Tuple[int, dict]:
+        game = table.game
+        result = dict(mainline=game.mainline.view().strings(), **self._summary(game))
+        if "player" in query:
+            index, player = self._player(table, {"player": int(query["player"][0])})
+            result["hand"] = [str(card) for card in player.hand]
+            result["perspective"] = game.get_player_perspective(player)
+        return 200, result
+
+    async def hypothesis(self, table: Table, body: dict) -> Tuple[int, dict]:
+        """Judge a hypothesis exactly with the rule DSL, on the shared pool; undecidable ones cost nothing"""
+        game = table.game
+        index, player = self._player(table, body)
+        if game.is_over() or game.phase == GamePhase.SCORING:
+            raise HTTPError(409, "Game is over")
+        text = str(body.get("hypothesis", ""))
+        verdict = await asyncio.get_running_loop().run_in_executor(
+            self.executor, check_hypothesis, text, game.current_rule, game.mainline.view(), list(game.sidelines))
+        if verdict is None:
+            return 200, {"valid": None, "reason": "UNDECIDED"}
+        valid, reason = verdict
+        if valid:
+            game.phase = GamePhase.SCORING
+        else:
+            game.deal_cards(player, 2)
+        return 200, dict(valid=valid, reason=reason, **self._summary(game))
+
+    async def handle(self, method: str, target: str, body: dict) -> Tuple[int, dict]:
+        """Route a request: POST /tables, POST /tables/{id}/join|play|hypothesis, GET /tables/{id}/state"""
+        self.requests += 1
+        url = urlsplit(target)
+        parts = [part for part in url.path.split("/") if part]
+        if parts == ["tables"]:
+            if method != "POST":
+                raise HTTPError(405, "Use POST to create a table")
+            return await self.create(body)
+        if len(parts) != 3 or parts[0] != "tables":
+            raise HTTPError(404, f"No route for {url.path}")
+        action = parts[2]
+        if action == "state":
+            if method != "GET":
+                raise HTTPError(405, "Use GET for the state")
+        elif action in ("join", "play", "hypothesis"):
+            if method != "POST":
+                raise HTTPError(405, f"Use POST for {action}")
+        else:
+            raise HTTPError(404, f"No route for {url.path}")
+        while True:
+            table = await self._table(parts[1])
+            async with table.lock:
+                # Evicted while this request waited for the lock: load the saved table again
+                if self.tables.get(parts[1]) is not table:
+                    continue
+                if action == "state":
+                    return await self.state(table, parse_qs(url.query))
+                return await getattr(self, action)(table, body)
+
+    # Transport
+
+    async def _connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Serve HTTP/1.1 requests on one keep-alive connection"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    method, target, _ = request_line.decode("latin-1").split(" ", 2)
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    # The rest of the stream cannot be framed, answer and close
+                    status, payload, keep_alive = 400, {"error": "Malformed request"}, False
+                else:
+                    raw = await reader.readexactly(length) if length else b""
+                    try:
+                        body = json.loads(raw) if raw else {}
+                        if not isinstance(body, dict):
+                            raise HTTPError(400, "The body must be a JSON object")
+                        status, payload = await self.handle(method, target, body)
+                    except HTTPError as e:
+                        status, payload = e.status, {"error": str(e)}
+                    except (ValueError, TypeError) as e:
+                        status, payload = 400, {"error": str(e)}
+                    except Exception as e:
+                        status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS.get(status, '')}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8765, unix: Optional[str] = None):
+        if unix:
+            server = await asyncio.start_unix_server(self._connection, unix)
+        else:
+            server = await asyncio.start_server(self._connection, host, port, backlog=1024)
+        evictor = asyncio.create_task(self._evict_forever())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            evictor.cancel()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve Eleusis tables over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--state-dir", default="./tables")
+    parser.add_argument("--idle", type=float, default=300.0, help="Seconds before an idle table is evicted to disk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count(), help="Threads of the shared validation pool")
+    args = parser.parse_args()
+
+    game_server = GameServer(args.state_dir, args.idle, ThreadPoolExecutor(max_workers=args.workers))
+    try:
+        asyncio.run(game_server.serve(args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
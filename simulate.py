@@ -0,0 +1,155 @@
+from typing import Callable, Dict, List, Optional
+import argparse
+import json
+import random
+
+from cards import Card
+from eleusis import EleusisGame
+from gametable import Player
+from rules import RULES
+
+
+Policy = Callable[[EleusisGame, Player, random.Random], Card]
+
+
+def random_policy(game: EleusisGame, player: Player, rng: random.Random) -> Card:
+    """Play any card from the hand"""
+    return rng.choice(list(player.hand))
+
+
+def greedy_policy(game: EleusisGame, player: Player, rng: random.Random) -> Card:
+    """
+    Play the card the observed mainline and sidelines make most likely legal,
+    without knowing the rule
+    """
+    if not game.mainline:
+        return rng.choice(list(player.hand))
+    prev = game.mainline[-1]
+
+    accepted = list(zip(game.mainline, game.mainline[1:]))
+    rejected = [(history[-1], card) for card, history in game.sidelines if history]
+
+    def score(card: Card) -> float:
+        total = 0.0
+        for observations, sign in ((accepted, 1), (rejected, -1)):
+            for before, after in observations:
+                if before == prev and after == card:
+                    total += sign * 10
+                elif before.color == prev.color and after.color == card.color:
+                    total += sign
+        return total + rng.random()
+
+    return max(player.hand, key=score)
+
+
+def oracle_policy(game: EleusisGame, player: Player, rng: random.Random) -> Card:
+    """Play a legal card whenever the hand holds one"""
+    legal = game.legal_cards(player)
+    return rng.choice(legal or list(player.hand))
+
+
+POLICIES: Dict[str, Policy] = {
+    "random": random_policy,
+    "greedy": greedy_policy,
+    "oracle": oracle_policy,
+}
+
+
+def run_game(rule_index: int, seed: int, policy: str = "random", num_players: int = 1, max_turns: int = 500) -> dict:
+    """
+    Play one headless round of Eleusis
+    :param rule_index: Index of the secret rule in rules.RULES
+    :param seed: Seed of the table, which also drives the policy
+    :param policy: Name of the policy in POLICIES
+    :return: Summary of the round
+    """
+    game = EleusisGame(num_players, seed=seed, verbose=False)
+    game.setup_round(0)
+    game.current_rule, game.current_rule_description = RULES[rule_index]
+    play = POLICIES[policy]
+
+    turns = 0
+    while not game.is_over() and turns < max_turns:
+        player = game.get_current_player()
+        game.play_card(player, play(game, player, game.table.rng))
+        turns += 1
+
+    finished = game.is_over()
+    prophet_bonus = game.score_round()
+    total_plays = len(game.mainline) + len(game.sidelines)
+    return {
+        "rule_index": rule_index,
+        "seed": seed,
+        "turns": turns,
+        "finished": finished,
+        "valid_plays": len(game.mainline),
+        "valid_ratio": len(game.mainline) / total_plays if total_plays else 0.0,
+        "prophet_bonus": prophet_bonus,
+    }
+
+
+def _run_game(args: tuple) -> dict:
+    return run_game(*args)
+
+
+def aggregate(results: List[dict]) -> List[dict]:
+    """Aggregate round summaries per rule"""
+    by_rule: Dict[int, List[dict]] = {}
+    for result in results:
+        by_rule.setdefault(result["rule_index"], []).append(result)
+
+    summary = []
+    for rule_index in sorted(by_rule):
+        games = by_rule[rule_index]
+        summary.append({
+            "rule": RULES[rule_index][1],
+            "games": len(games),
+            "mean_turns": sum(g["turns"] for g in games) / len(games),
+            "mean_valid_ratio": sum(g["valid_ratio"] for g in games) / len(games),
+            "prophet_bonus_rate": sum(g["prophet_bonus"] for g in games) / len(games),
+            "finished_rate": sum(g["finished"] for g in games) / len(games),
+        })
+    return summary
+
+
+def simulate(
+    num_games: int,
+    policy: str = "random",
+    rule_indices: Optional[List[int]] = None,
+    num_players: int = 1,
+    max_turns: int = 500,
+    seed: int = 0,
+    workers: Optional[int] = None,
+) -> List[dict]:
+    """
+    Run many headless rounds across a process pool
+    Game i uses rule rule_indices[i % len(rule_indices)] and seed seed + i,
+    so results do not depend on the number of workers
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"Unknown policy {policy}, expected one of {', '.join(POLICIES)}")
+    rule_indices = rule_indices if rule_indices is not None else list(range(len(RULES)))
+    jobs = [
+        (rule_indices[i % len(rule_indices)], seed + i, policy, num_players, max_turns)
+        for i in range(num_games)
+    ]
+    if workers == 1:
+        return [_run_game(job) for job in jobs]
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_run_game, jobs, chunksize=max(1, len(jobs) // 64)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Headless Eleusis self-play")
+    parser.add_argument("--games", type=int, default=1000)
+    parser.add_argument("--policy", choices=list(POLICIES), default="random")
+    parser.add_argument("--players", type=int, default=1)
+    parser.add_argument("--max-turns", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    results = simulate(args.games, args.policy, num_players=args.players, max_turns=args.max_turns,
+                       seed=args.seed, workers=args.workers)
+    print(json.dumps(aggregate(results), indent=2, ensure_ascii=False))
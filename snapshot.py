@@ -0,0 +1,276 @@
+from typing import Dict, List, Optional, Union
+import json
+import os
+import random
+import struct
+
+from cards import Card, CardArray, Deck, Mainline, MainlineView, Shoe, NUM_CARDS
+from eleusis import EleusisGame, EleusisLLM, GamePhase
+from gametable import GameTable, Player, River
+from history import _Buffer, _varint, _zigzag
+from instrumentation import Instrumentation
+from perspective import PerspectiveRenderer
+from rules import RULES, EXTENDED_RULES
+
+MAGIC = b"ELSS"
+VERSION = 2
+
+# Header flags
+IS_LLM = 1
+COMPACT = 2
+SHOE = 4
+VERBOSE = 8
+HAS_RULE = 16
+HAS_WEIGHTS = 32
+HAS_HISTORY = 64
+COMPACT_RENDERER = 128
+
+PHASES = tuple(GamePhase)
+# Rules are stored as their index in this registry, so a snapshot only holds data
+REGISTRY = [rule for rule, _ in RULES + EXTENDED_RULES]
+_MT_STATE = struct.Struct("<625I")
+
+
+def _string(text: str) -> bytes:
+    data = text.encode("utf-8")
+    return _varint(len(data)) + data
+
+
+def _cards(cards) -> bytes:
+    """Card sequence as a length and one byte per card code"""
+    codes = cards.codes if isinstance(cards, (CardArray, Mainline)) else bytes(card.code for card in cards)
+    return _varint(len(codes)) + bytes(codes)
+
+
+class _Reader(_Buffer):
+    def string(self) -> str:
+        length = self.varint()
+        self.position += length
+        return self.data[self.position - length:self.position].decode("utf-8")
+
+    def codes(self) -> bytes:
+        length = self.varint()
+        self.position += length
+        return self.data[self.position - length:self.position]
+
+    def cards(self) -> List[Card]:
+        return [Card.from_code(code) for code in self.codes()]
+
+
+def _rule_index(rule) -> int:
+    for index, known in enumerate(REGISTRY):
+        if known is rule:
+            return index
+    raise ValueError(f"Cannot snapshot {getattr(rule, '__name__', rule)}, only rules of rules.RULES and EXTENDED_RULES")
+
+
+def dumps(game: EleusisGame, history: bool = True) -> bytes:
+    """
+    Serialize the full state of a game: deck or shoe, hands, mainline, invalid plays, scores,
+    RNG state, hypothesis history and, for an EleusisLLM, previous_rounds.
+    The LLM callables and instrumentation are not saved, they are given back to loads()
+    :param history: Include the turn history (game.history), not needed to keep playing
+    """
+    table = game.table
+    is_llm = isinstance(game, EleusisLLM)
+    compact = isinstance(table.players[0].hand, CardArray) if table.players else False
+    flags = (IS_LLM * is_llm | COMPACT * compact | SHOE * isinstance(table.deck, Shoe) | VERBOSE * game.verbose
+             | HAS_RULE * (game.current_rule is not None) | HAS_WEIGHTS * (game.rule_weights is not None)
+             | HAS_HISTORY * history | COMPACT_RENDERER * game.renderer.compact)
+    out = bytearray(MAGIC + bytes([VERSION]) + _varint(flags))
+
+    if game.current_rule is not None:
+        out += _varint(_rule_index(game.current_rule))
+    out += _string(game.current_rule_description)
+    if game.rule_weights is not None:
+        out += _varint(len(game.rule_weights)) + struct.pack(f"<{len(game.rule_weights)}d", *game.rule_weights)
+    out += _varint(PHASES.index(game.phase))
+
+    out += _varint(len(table.players))
+    for player in table.players:
+        out += _string(player.name) + _cards(player.hand)
+        # Signed, scores go negative after score_round
+        out += _varint(_zigzag(game.scores[player])) + _varint(_zigzag(game.invalid_plays[player]))
+    out += _varint(table.players.index(game.prophet) + 1 if game.prophet is not None else 0)
+    out += _varint(game.current_player_idx) + _varint(table.current_player_idx) + bytes([table.direction == 1])
+    out += _cards(table.river.cards)
+    if isinstance(table.deck, Shoe):
+        out += b"".join(_varint(count) for count in table.deck.counts)
+    else:
+        out += _cards(table.deck.cards)
+
+    version, state, gauss = table.rng.getstate()
+    out += _varint(version) + _MT_STATE.pack(*state)
+    out += struct.pack("<?d", gauss is not None, gauss or 0.0)
+
+    # Mainlines referenced by invalid plays and logged views, the game mainline first
+    bases: Dict[int, int] = {id(game.mainline): 0}
+    mainlines = [game.mainline]
+
+    def base(view: MainlineView) -> int:
+        if id(view.base) not in bases:
+            bases[id(view.base)] = len(mainlines)
+            mainlines.append(view.base)
+        return bases[id(view.base)]
+
+    def default(value):
+        if isinstance(value, MainlineView):
+            return {"__view__": [base(value), value.length]}
+        raise TypeError(f"Object of type {type(value).__name__} cannot be snapshot")
+
+    logs = json.dumps([game.history if history else [], game.previous_rounds if is_llm else []],
+                      default=default, ensure_ascii=False, separators=(",", ":"))
+    sidelines = bytearray(_varint(len(game.sidelines)))
+    for card, view in game.sidelines:
+        sidelines += bytes([card.code]) + _varint(base(view)) + _varint(len(view))
+
+    out += _varint(len(mainlines)) + b"".join(_cards(mainline) for mainline in mainlines)
+    out += sidelines
+    out += _varint(game.renderer.keep_recent) + _varint(len(game.renderer.hypotheses))
+    for hypothesis, result, repeats in game.renderer.hypotheses:
+        out += _string(hypothesis) + _string(result) + _varint(repeats)
+    out += _string(logs)
+    return bytes(out)
+
+
+def loads(
+    data: bytes,
+    llm=None,
+    judge_fn=None,
+    batch_judge_fn=None,
+    instrumentation: Optional[Instrumentation] = None,
+) -> Union[EleusisGame, EleusisLLM]:
+    """
+    Rebuild a game from dumps(); an EleusisLLM gets the given LLM, judge functions and instrumentation
+    """
+    if data[:len(MAGIC)] != MAGIC:
+        raise ValueError("Not an Eleusis snapshot")
+    if data[len(MAGIC)] > VERSION:
+        raise ValueError(f"Snapshot version {data[len(MAGIC)]} is newer than the supported version {VERSION}")
+    buffer = _Reader(data)
+    buffer.position = len(MAGIC) + 1
+    # Version 1 stored scores and invalid plays unsigned
+    signed = buffer.signed if data[len(MAGIC)] >= 2 else buffer.varint
+    flags = buffer.varint()
+    compact = bool(flags & COMPACT)
+
+    game = (EleusisLLM if flags & IS_LLM else EleusisGame).__new__(EleusisLLM if flags & IS_LLM else EleusisGame)
+    game.verbose = bool(flags & VERBOSE)
+    game.current_rule = REGISTRY[buffer.varint()] if flags & HAS_RULE else None
+    game.current_rule_description = buffer.string()
+    game.rule_weights = None
+    if flags & HAS_WEIGHTS:
+        count = buffer.varint()
+        game.rule_weights = list(struct.unpack_from(f"<{count}d", data, buffer.position))
+        buffer.position += 8 * count
+    game.phase = PHASES[buffer.varint()]
+
+    table = GameTable.__new__(GameTable)
+    table.players = []
+    game.scores, game.invalid_plays = {}, {}
+    for _ in range(buffer.varint()):
+        player = Player(buffer.string(), compact)
+        for card in buffer.cards():
+            player.add_card(card)
+        game.scores[player] = signed()
+        game.invalid_plays[player] = signed()
+        table.players.append(player)
+    prophet = buffer.varint()
+    game.prophet = table.players[prophet - 1] if prophet else None
+    game.current_player_idx = buffer.varint()
+    table.current_player_idx = buffer.varint()
+    table.direction = 1 if buffer.data[buffer.position] else -1
+    buffer.position += 1
+    table.river = River(compact)
+    for card in buffer.cards():
+        table.river.add_card(card)
+    if flags & SHOE:
+        table.deck = Shoe.__new__(Shoe)
+        table.deck.counts = [buffer.varint() for _ in range(NUM_CARDS)]
+        table.deck.remaining = sum(table.deck.counts)
+    else:
+        table.deck = Deck.__new__(Deck)
+        codes = buffer.codes()
+        table.deck.cards = CardArray.from_codes(codes) if compact else [Card.from_code(code) for code in codes]
+
+    version = buffer.varint()
+    state = _MT_STATE.unpack_from(data, buffer.position)
+    buffer.position += _MT_STATE.size
+    has_gauss, gauss = struct.unpack_from("<?d", data, buffer.position)
+    buffer.position += 9
+    table.rng = random.Random()
+    table.rng.setstate((version, state, gauss if has_gauss else None))
+    if flags & SHOE:
+        table.deck.rng = table.rng
+    game.table = table
+
+    mainlines = [Mainline.from_codes(buffer.codes()) for _ in range(buffer.varint())]
+    game._rule = game._rule_state = None
+    game._rule_state_len = 0
+    game.mainline = mainlines[0]
+    game.sidelines = []
+    for _ in range(buffer.varint()):
+        card = Card.from_code(buffer.data[buffer.position])
+        buffer.position += 1
+        game.sidelines.append((card, mainlines[buffer.varint()].view(buffer.varint())))
+
+    # The renderer text buffers are rebuilt from the mainline and invalid plays on first use
+    game.renderer = PerspectiveRenderer(bool(flags & COMPACT_RENDERER), buffer.varint())
+    game.renderer.hypotheses = [[buffer.string(), buffer.string(), buffer.varint()] for _ in range(buffer.varint())]
+
+    def view(entry: dict):
+        if "__view__" in entry and len(entry) == 1:
+            index, length = entry["__view__"]
+            return mainlines[index].view(length)
+        return entry
+
+    game.history, previous_rounds = json.loads(buffer.string(), object_hook=view)
+    if flags & IS_LLM:
+        game.llm = llm
+        game.judge_fn = judge_fn
+        game.batch_judge_fn = batch_judge_fn
+        game.instrumentation = instrumentation or Instrumentation()
+        game.previous_rounds = previous_rounds
+    return game
+
+
+def clone(game: EleusisGame, history: bool = True) -> EleusisGame:
+    """Independent copy of a game, e.g. to branch an experiment or for lookahead search"""
+    if isinstance(game, EleusisLLM):
+        return loads(dumps(game, history), game.llm, game.judge_fn, game.batch_judge_fn)
+    return loads(dumps(game, history))
+
+
+def save(game: EleusisGame, path: str, history: bool = True):
+    """Write a snapshot atomically, so an interrupted save keeps the previous one"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(f"{path}.tmp", "wb") as f:
+        f.write(dumps(game, history))
+    os.replace(f"{path}.tmp", path)
+
+
+def load(path: str, **kwargs) -> Union[EleusisGame, EleusisLLM]:
+    """Read a snapshot written by save(), see loads() for the arguments"""
+    with open(path, "rb") as f:
+        return loads(f.read(), **kwargs)
+
+
+if __name__ == "__main__":
+    import timeit
+    game = EleusisGame(4, seed=0, verbose=False)
+    game.setup_round(0)
+    for _ in range(60):
+        if game.is_over():
+            break
+        player = game.get_current_player()
+        game.play_card(player, player.hand[0])
+    game.scores[game.table.players[1]] = -3
+    restored = loads(dumps(game))
+    assert [restored.scores[player] for player in restored.table.players] == [game.scores[player] for player in game.table.players]
+    data = dumps(game)
+    print(f"{len(data)} bytes, {len(dumps(game, history=False))} without history")
+    for history in (True, False):
+        data = dumps(game, history)
+        number = 2000
+        print(f"history={history}: dumps {timeit.timeit(lambda: dumps(game, history), number=number) / number * 1e6:.1f} µs, "
+              f"loads {timeit.timeit(lambda: loads(data), number=number) / number * 1e6:.1f} µs")
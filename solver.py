@@ -0,0 +1,123 @@
+from functools import lru_cache
+from typing import List, Optional, Tuple
+import re
+
+from cards import Card, NUM_CARDS
+from hypothesis import (PROPERTIES, Expression, Always, Every, Relation, After, NotTwoInARow, SumAtMost)
+from schemas import Action
+
+
+def grammar() -> List[Expression]:
+    """Candidate rules, simplest first: card properties, relations to the previous card and their combinations"""
+    properties = list(PROPERTIES.values())
+    relations = [Relation(kind) for kind in Relation.PHRASES]
+    candidates: List[Expression] = [Always()]
+    candidates += [Every(prop) for prop in properties]
+    candidates += relations
+    candidates += [NotTwoInARow(prop) for prop in properties]
+    candidates += [SumAtMost(limit) for limit in range(3, 26)]
+    candidates += [After(prop, Every(other)) for prop in properties for other in properties if other is not prop]
+    candidates += [After(prop, relation) for prop in properties for relation in relations]
+    return candidates
+
+
+def _bitset(table: bytes) -> int:
+    """Pack the accept flags of a 52×52 table into an int, bit prev * 52 + curr"""
+    return int("".join("1" if accepted else "0" for accepted in reversed(table)), 2)
+
+
+@lru_cache(maxsize=None)
+def version_space() -> Tuple[Tuple[Expression, int, int], ...]:
+    """Distinct candidate rules as (expression, transition bitset, number of accepted pairs)"""
+    seen = set()
+    space = []
+    for expression in grammar():
+        bits = _bitset(expression.table())
+        if bits not in seen:
+            seen.add(bits)
+            space.append((expression, bits, bin(bits).count("1")))
+    return tuple(space)
+
+
+def _pair(prev: Card, curr: Card) -> int:
+    return 1 << (prev.code * NUM_CARDS + curr.code)
+
+
+def _cards(text: str) -> List[Card]:
+    text = text.strip()
+    if not text or text in ("Empty", "None"):
+        return []
+    return [Card.parse(card.strip()) for card in re.split(r" → |, ", text) if card.strip()]
+
+
+def parse_perspective(perspective: str) -> Tuple[List[Card], List[Card], List[Tuple[Card, Optional[Card]]]]:
+    """
+    Read the hand, mainline and invalid plays from EleusisGame.get_player_perspective
+    Invalid plays are returned as (card, previous mainline card or None)
+    """
+    hand = _cards(re.search(r"Your Hand:\n(.*)\n", perspective).group(1))
+    mainline = _cards(re.search(r"Current Mainline \(Valid Plays\):\n(.*)\n", perspective).group(1))
+    block = re.search(r"History of Invalid Plays:\n(.*?)\n\n", perspective, re.S).group(1)
+    sidelines = []
+    for line in block.splitlines():
+        full = re.match(r"\s*(\S+) was invalid when mainline was: ?(.*)$", line)
+        short = re.match(r"\s*(\S+) was invalid (?:after (\S+)|as first card)$", line)
+        if full:
+            history = _cards(full.group(2))
+            sidelines.append((Card.parse(full.group(1)), history[-1] if history else None))
+        elif short:
+            sidelines.append((Card.parse(short.group(1)), Card.parse(short.group(2)) if short.group(2) else None))
+    return hand, mainline, sidelines
+
+
+class RuleSolver:
+    """Version-space learner over the rule grammar, usable as LLM(RuleSolver()) in EleusisLLM"""
+
+    def __init__(self):
+        self.space = version_space()
+
+    def consistent(self, mainline: List[Card], sidelines: List[Tuple[Card, Optional[Card]]]) -> List[Tuple[Expression, int, int]]:
+        """Candidates accepting every mainline transition and rejecting every invalid play"""
+        accepted = 0
+        for prev, curr in zip(mainline, mainline[1:]):
+            accepted |= _pair(prev, curr)
+        rejected = 0
+        for card, prev in sidelines:
+            if prev is not None:
+                rejected |= _pair(prev, card)
+        return [c for c in self.space if c[1] & accepted == accepted and not c[1] & rejected]
+
+    def choose(self, hand: List[Card], mainline: List[Card], sidelines: List[Tuple[Card, Optional[Card]]]) -> Action:
+        survivors = self.consistent(mainline, sidelines) or list(self.space)
+        # Size principle: the most specific consistent rule explains the accepted plays best
+        best = min(survivors, key=lambda candidate: candidate[2])
+
+        card_index = 0
+        if mainline:
+            prev = mainline[-1]
+            scores = []
+            for index, card in enumerate(hand):
+                pair = _pair(prev, card)
+                accepting = sum(1 for _, bits, _ in survivors if bits & pair)
+                # Prefer the play that splits the surviving rules most evenly, then the most likely legal one
+                scores.append((min(accepting, len(survivors) - accepting), accepting, -index))
+            card_index = -max(scores)[2]
+        return Action(general_hypothesis=str(best[0]), card_index=card_index)
+
+    def __call__(self, perspective: str) -> Action:
+        hand, mainline, sidelines = parse_perspective(perspective)
+        return self.choose(hand, mainline, sidelines)
+
+
+if __name__ == "__main__":
+    from eleusis import EleusisLLM, LLM
+    game = EleusisLLM(LLM(RuleSolver()), seed=0, verbose=False)
+    game.setup_round(0)
+    turns = 0
+    while not game.is_over() and turns < 200:
+        player = game.get_current_player()
+        action = game.llm.play(game._build_player_perspective(player))
+        entry = game._process_player_action(player, action)
+        turns += 1
+        print(f"{turns:3d} {entry.get('card_played', '-'):4s} {action.general_hypothesis} -> {entry['result']}")
+    print(f"Secret rule: {game.current_rule_description}")
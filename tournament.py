@@ -0,0 +1,310 @@
+from typing import Callable, Dict, List, Optional, Tuple
+import argparse
+import itertools
+import json
+import os
+import random
+
+from eleusis import EleusisGame
+from gametable import Player
+from hypothesis import check_hypothesis
+from rules import RULES
+from schemas import Action
+import simulate
+
+
+# An agent acts for a player: (game, player, rng) -> Action, with an empty hypothesis to make no claim
+Agent = Callable[[EleusisGame, Player, random.Random], Action]
+
+
+def _policy_agent(policy: str) -> Agent:
+    """Card-only policy from simulate.py, which never claims a rule"""
+    play = simulate.POLICIES[policy]
+    def act(game: EleusisGame, player: Player, rng: random.Random) -> Action:
+        card = play(game, player, rng)
+        return Action(general_hypothesis="", card_index=player.hand.index(card))
+    return act
+
+
+def _solver_agent() -> Agent:
+    from solver import RuleSolver
+    solver = RuleSolver()
+    def act(game: EleusisGame, player: Player, rng: random.Random) -> Action:
+        sidelines = [(card, history[-1] if history else None) for card, history in game.sidelines]
+        return solver.choose(list(player.hand), game.mainline, sidelines)
+    return act
+
+
+def _mcts_agent() -> Agent:
+    from mcts import MCTSPlanner
+    # One process per match already, so the planner searches a single tree with a short budget,
+    # and only claims a rule it is confident about since wrong claims cost two cards
+    planner = MCTSPlanner(budget=0.05, claim_threshold=0.9)
+    def act(game: EleusisGame, player: Player, rng: random.Random) -> Action:
+        sidelines = [(card, history[-1] if history else None) for card, history in game.sidelines]
+        return planner.choose(list(player.hand), game.mainline, sidelines)
+    return act
+
+
+def _llm_agent() -> Agent:
+    from llm import haiku_play
+    def act(game: EleusisGame, player: Player, rng: random.Random) -> Action:
+        return haiku_play(game.get_player_perspective(player))
+    return act
+
+
+# name -> (factory, True if the agent calls an LLM)
+AGENTS: Dict[str, Tuple[Callable[[], Agent], bool]] = {
+    "random": (lambda: _policy_agent("random"), False),
+    "greedy": (lambda: _policy_agent("greedy"), False),
+    "oracle": (lambda: _policy_agent("oracle"), False),
+    "solver": (_solver_agent, False),
+    "mcts": (_mcts_agent, False),
+    "haiku": (_llm_agent, True),
+}
+
+_agents: Dict[str, Agent] = {}
+
+
+def _agent(name: str) -> Agent:
+    """Agents are built once per worker process"""
+    if name not in _agents:
+        _agents[name] = AGENTS[name][0]()
+    return _agents[name]
+
+
+def play_match(match: dict, max_turns: int = 200) -> dict:
+    """
+    Play one two-player game between match["agents"] on rule match["rule_index"].
+    A player wins by stating a correct hypothesis (checked exactly with the rule DSL; hypotheses it cannot
+    parse go to the LLM judge for LLM agents and are no claim otherwise, each wrong claim costing two cards)
+    or else by emptying their hand first
+    """
+    game = EleusisGame(2, seed=match["seed"], verbose=False)
+    game.setup_round(0)
+    game.current_rule, game.current_rule_description = RULES[match["rule_index"]]
+    agents = [_agent(name) for name in match["agents"]]
+    rng = random.Random(match["seed"])
+
+    result = dict(match, winner=None, solved_by=None, discovery_turn=None, turns=0)
+    while result["turns"] < max_turns:
+        seat = game.current_player_idx
+        player = game.table.players[seat]
+        action = agents[seat](game, player, rng)
+        result["turns"] += 1
+        game.play_card(player, player.hand[action.card_index])
+        if action.general_hypothesis:
+            verdict = check_hypothesis(action.general_hypothesis, game.current_rule, game.mainline, game.sidelines)
+            if verdict is None and AGENTS[match["agents"][seat]][1]:
+                # Free text the DSL rarely reads; LLM matches already run in the throttled pool
+                from llm import test_hypothesis
+                response = test_hypothesis(action.general_hypothesis, game.current_rule_description, game.get_game_state())
+                verdict = response.is_valid, response.reason
+            if verdict is not None:
+                if verdict[0]:
+                    result.update(winner=seat, solved_by=seat, discovery_turn=result["turns"])
+                    break
+                game.deal_cards(player, 2)
+        if game.is_over():
+            result["winner"] = next(i for i, p in enumerate(game.table.players) if not p.hand)
+            break
+    return result
+
+
+def _play_match(match: dict) -> dict:
+    return play_match(match)
+
+
+class Elo:
+    def __init__(self, k: float = 16.0, initial: float = 1500.0):
+        self.k = k
+        self.initial = initial
+        self.ratings: Dict[str, float] = {}
+
+    def rating(self, name: str) -> float:
+        return self.ratings.get(name, self.initial)
+
+    def update(self, a: str, b: str, score_a: float):
+        """Update both ratings after a game, score_a being 1, 0.5 or 0"""
+        expected_a = 1 / (1 + 10 ** ((self.rating(b) - self.rating(a)) / 400))
+        delta = self.k * (score_a - expected_a)
+        self.ratings[a] = self.rating(a) + delta
+        self.ratings[b] = self.rating(b) - delta
+
+
+def _pair_matches(round_index: int, a: str, b: str, rule_indices: List[int], seed: int) -> List[dict]:
+    """Every rule, once from each seat"""
+    matches = []
+    for rule_index in rule_indices:
+        for seats in ((a, b), (b, a)):
+            match_seed = seed + len(matches) + 1000 * round_index
+            matches.append({
+                "id": f"{round_index}:{seats[0]}:{seats[1]}:{rule_index}:{match_seed}",
+                "round": round_index,
+                "agents": list(seats),
+                "rule_index": rule_index,
+                "seed": match_seed,
+            })
+    return matches
+
+
+def round_robin(agents: List[str], rule_indices: List[int], seed: int = 0) -> List[List[dict]]:
+    """A single round where every pair of agents meets on every rule"""
+    matches = []
+    for a, b in itertools.combinations(agents, 2):
+        matches += _pair_matches(0, a, b, rule_indices, seed)
+    return [matches]
+
+
+def swiss_pairings(agents: List[str], elo: Elo, played: set) -> List[Tuple[str, str]]:
+    """Pair agents of close rating, avoiding rematches when possible; an odd agent out gets a bye"""
+    pool = sorted(agents, key=lambda name: -elo.rating(name))
+    pairs = []
+    while len(pool) > 1:
+        a = pool.pop(0)
+        opponent = next((b for b in pool if frozenset((a, b)) not in played), pool[0])
+        pool.remove(opponent)
+        pairs.append((a, opponent))
+    return pairs
+
+
+class Tournament:
+    def __init__(
+        self,
+        agents: List[str],
+        rule_indices: Optional[List[int]] = None,
+        checkpoint: Optional[str] = None,
+        workers: Optional[int] = None,
+        llm_workers: int = 2,
+        seed: int = 0,
+    ):
+        """
+        Matches between agents on the rules of rules.RULES, with Elo ratings and per-rule statistics
+        :param checkpoint: JSONL file of finished matches, appended as they complete and skipped on resume
+        :param workers: Processes for local agents (default: one per CPU)
+        :param llm_workers: Concurrent matches involving an LLM agent, throttled separately
+        """
+        unknown = [name for name in agents if name not in AGENTS]
+        if unknown:
+            raise ValueError(f"Unknown agents {', '.join(unknown)}, expected some of {', '.join(AGENTS)}")
+        self.agents = agents
+        self.rule_indices = rule_indices if rule_indices is not None else list(range(len(RULES)))
+        self.checkpoint = checkpoint
+        self.workers = workers
+        self.llm_workers = llm_workers
+        self.seed = seed
+        self.results: Dict[str, dict] = {}
+        self.schedule: List[dict] = []
+        if checkpoint and os.path.exists(checkpoint):
+            with open(checkpoint) as f:
+                for line in f:
+                    try:
+                        result = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Blank line or a line cut short by an interruption: the match is played again
+                        continue
+                    self.results[result["id"]] = result
+
+    def _run(self, matches: List[dict]):
+        """Play the matches missing from the checkpoint, local and LLM ones in separate pools"""
+        from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+        self.schedule += matches
+        pending = [match for match in matches if match["id"] not in self.results]
+        if not pending:
+            return
+        uses_llm = lambda match: any(AGENTS[name][1] for name in match["agents"])
+        local = [match for match in pending if not uses_llm(match)]
+        remote = [match for match in pending if uses_llm(match)]
+        out = open(self.checkpoint, "a") if self.checkpoint else None
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as processes, \
+                    ThreadPoolExecutor(max_workers=self.llm_workers) as threads:
+                futures = [processes.submit(_play_match, match) for match in local]
+                futures += [threads.submit(_play_match, match) for match in remote]
+                for future in as_completed(futures):
+                    result = future.result()
+                    self.results[result["id"]] = result
+                    if out:
+                        out.write(json.dumps(result) + "\n")
+                        out.flush()
+        finally:
+            if out:
+                out.close()
+
+    def run(self, format: str = "round_robin", rounds: int = 3) -> dict:
+        if format == "round_robin":
+            for matches in round_robin(self.agents, self.rule_indices, self.seed):
+                self._run(matches)
+        elif format == "swiss":
+            played = set()
+            for round_index in range(rounds):
+                matches = []
+                for a, b in swiss_pairings(self.agents, self.ratings(), played):
+                    played.add(frozenset((a, b)))
+                    matches += _pair_matches(round_index, a, b, self.rule_indices, self.seed)
+                self._run(matches)
+        else:
+            raise ValueError(f"Unknown format {format}, expected round_robin or swiss")
+        return self.standings()
+
+    def ratings(self) -> Elo:
+        """Elo ratings replayed in schedule order, so a resumed tournament gets the same ratings"""
+        elo = Elo()
+        for match in self.schedule:
+            result = self.results.get(match["id"])
+            if result is None:
+                continue
+            a, b = result["agents"]
+            score_a = 0.5 if result["winner"] is None else float(result["winner"] == 0)
+            elo.update(a, b, score_a)
+        return elo
+
+    def standings(self) -> dict:
+        elo = self.ratings()
+        stats = {name: {"games": 0, "wins": 0, "solves": 0, "discovery_turns": 0, "per_rule": {}} for name in self.agents}
+        for match in self.schedule:
+            result = self.results.get(match["id"])
+            if result is None:
+                continue
+            for seat, name in enumerate(result["agents"]):
+                rule = RULES[result["rule_index"]][1]
+                entries = [stats[name], stats[name]["per_rule"].setdefault(rule, {"games": 0, "wins": 0, "solves": 0, "discovery_turns": 0})]
+                for entry in entries:
+                    entry["games"] += 1
+                    entry["wins"] += result["winner"] == seat
+                    if result["solved_by"] == seat:
+                        entry["solves"] += 1
+                        entry["discovery_turns"] += result["discovery_turn"]
+
+        def rates(entry: dict) -> dict:
+            return {
+                "games": entry["games"],
+                "win_rate": entry["wins"] / entry["games"] if entry["games"] else 0.0,
+                "solve_rate": entry["solves"] / entry["games"] if entry["games"] else 0.0,
+                "mean_turns_to_discovery": entry["discovery_turns"] / entry["solves"] if entry["solves"] else None,
+            }
+
+        ranking = sorted(self.agents, key=lambda name: -elo.rating(name))
+        return {
+            "ranking": [
+                dict(agent=name, elo=round(elo.rating(name), 1), **rates(stats[name]),
+                     per_rule={rule: rates(entry) for rule, entry in stats[name]["per_rule"].items()})
+                for name in ranking
+            ],
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rank Eleusis agents against each other")
+    parser.add_argument("--agents", nargs="+", choices=list(AGENTS), default=["random", "greedy", "solver"])
+    parser.add_argument("--format", choices=["round_robin", "swiss"], default="round_robin")
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds of a Swiss tournament")
+    parser.add_argument("--checkpoint", help="JSONL file to resume from and append results to")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--llm-workers", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    tournament = Tournament(args.agents, checkpoint=args.checkpoint, workers=args.workers,
+                            llm_workers=args.llm_workers, seed=args.seed)
+    print(json.dumps(tournament.run(args.format, args.rounds), indent=2, ensure_ascii=False))
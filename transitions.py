@@ -0,0 +1,95 @@
+from functools import lru_cache
+from typing import Callable, List, Optional, Sequence, Tuple
+import random
+
+from cards import Card, NUM_CARDS
+from rules import Rule
+
+
+def probe_window2(rule: Callable[[List[Card]], bool], seed: int = 0) -> bool:
+    """
+    Detect whether an undeclared rule only depends on the last two cards,
+    by checking every card pair against a random longer prefix
+    """
+    rng = random.Random(seed)
+    cards = [Card.from_code(code) for code in range(NUM_CARDS)]
+    for prev in cards:
+        for curr in cards:
+            prefix = rng.choices(cards, k=rng.randint(1, 4))
+            if rule(prefix + [prev, curr]) != rule([prev, curr]):
+                return False
+    return True
+
+
+def is_window2(rule: Callable[[List[Card]], bool]) -> bool:
+    """
+    Return True if the rule is declared (or detected) to look at the last two cards only.
+    Only plain functions are probed: an incremental Rule without a window keeps state over
+    more cards than the probe's short prefixes reach
+    """
+    declared = getattr(rule, "window", None)
+    if declared is not None:
+        return declared <= 2
+    if isinstance(rule, Rule):
+        return False
+    return probe_window2(rule)
+
+
+class TransitionTable:
+    """52×52 table of the (previous, current) card pairs accepted by a window-2 rule"""
+
+    def __init__(self, rule: Callable[[List[Card]], bool]):
+        cards = [Card.from_code(code) for code in range(NUM_CARDS)]
+        self.rule = rule
+        self.table = bytes(rule([prev, curr]) for prev in cards for curr in cards)
+        # Legal successors of each card as a bitmask of card codes
+        self.successor_masks = tuple(
+            sum(1 << curr for curr in range(NUM_CARDS) if self.table[prev * NUM_CARDS + curr])
+            for prev in range(NUM_CARDS)
+        )
+
+    def accepts(self, prev: Card, curr: Card) -> bool:
+        """Return True if curr may follow prev"""
+        return bool(self.table[prev.code * NUM_CARDS + curr.code])
+
+    def is_valid(self, mainline: Sequence[Card], card: Card) -> bool:
+        """Return True if card may be appended to the mainline"""
+        if not mainline:
+            return True
+        return bool(self.table[mainline[-1].code * NUM_CARDS + card.code])
+
+    def legal_cards(self, prev: Optional[Card], hand: Sequence[Card]) -> List[Card]:
+        """Return the cards of hand that may follow prev (any card if prev is None)"""
+        if prev is None:
+            return list(hand)
+        row = prev.code * NUM_CARDS
+        return [card for card in hand if self.table[row + card.code]]
+
+    def row(self, prev: Card) -> bytes:
+        """Return the 52 accept flags for the successors of prev"""
+        return self.table[prev.code * NUM_CARDS:(prev.code + 1) * NUM_CARDS]
+
+    @property
+    def acceptance_rate(self) -> float:
+        """Fraction of the 52×52 card pairs accepted by the rule"""
+        return sum(self.table) / len(self.table)
+
+    def successor_counts(self) -> Tuple[int, ...]:
+        """Number of legal successors for each card code"""
+        return tuple(sum(self.table[row:row + NUM_CARDS]) for row in range(0, len(self.table), NUM_CARDS))
+
+
+@lru_cache(maxsize=None)
+def compile_rule(rule: Callable[[List[Card]], bool]) -> Optional[TransitionTable]:
+    """Return the cached transition table of a rule, or None if it is not window-2"""
+    if not is_window2(rule):
+        return None
+    return TransitionTable(rule)
+
+
+if __name__ == "__main__":
+    from rules import RULES
+    for rule, description in RULES:
+        table = compile_rule(rule)
+        counts = table.successor_counts()
+        print(f"{table.acceptance_rate:.3f} (successors {min(counts)}-{max(counts)})  {description}")
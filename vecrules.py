@@ -0,0 +1,112 @@
+from typing import Callable, Dict, List, Sequence
+import numpy as np
+
+import rules
+from cards import Card, NUM_CARDS, RANK_VALUE, SUIT_INDEX, IS_RED, IS_ODD, IS_FACE
+
+# Padding code for "no card" in a window (e.g. the first play on an empty mainline)
+NO_CARD = -1
+
+# Attribute tables as arrays, with one extra trailing slot so NO_CARD (-1) indexes safely
+_RANK_VALUE = np.array(RANK_VALUE + (0,), dtype=np.int16)
+_SUIT = np.array(SUIT_INDEX + (-1,), dtype=np.int8)
+_RED = np.array(IS_RED + (False,), dtype=bool)
+_ODD = np.array(IS_ODD + (False,), dtype=bool)
+_FACE = np.array(IS_FACE + (False,), dtype=bool)
+
+
+def encode(cards: Sequence[Card]) -> np.ndarray:
+    """Encode a sequence of cards as an int16 array of card codes"""
+    return np.fromiter((card.code for card in cards), dtype=np.int16, count=len(cards))
+
+
+def hand_windows(previous: Card, hand: Sequence[Card]) -> np.ndarray:
+    """Return the (N, 2) windows obtained by playing each card of hand after previous"""
+    windows = np.empty((len(hand), 2), dtype=np.int16)
+    windows[:, 0] = NO_CARD if previous is None else previous.code
+    windows[:, 1] = encode(hand)
+    return windows
+
+
+def all_transitions() -> np.ndarray:
+    """Return the (52*52, 2) windows of every (previous, current) card pair"""
+    prev, curr = np.divmod(np.arange(NUM_CARDS * NUM_CARDS, dtype=np.int16), NUM_CARDS)
+    return np.stack([prev, curr], axis=1)
+
+
+def _alternate_colors(prev, curr):
+    return _RED[prev] != _RED[curr]
+
+def _same_suit_or_rank(prev, curr):
+    return (_SUIT[prev] == _SUIT[curr]) | (_RANK_VALUE[prev] == _RANK_VALUE[curr])
+
+def _odd_even_alternating(prev, curr):
+    return _ODD[prev] != _ODD[curr]
+
+def _red_after_face(prev, curr):
+    return ~_FACE[prev] | _RED[curr]
+
+def _sum_under_15(prev, curr):
+    return (_RANK_VALUE[prev] + _RANK_VALUE[curr]) < 15
+
+def _same_color_as_prev_suit(prev, curr):
+    return _RED[prev] == _RED[curr]
+
+def _higher_after_hearts(prev, curr):
+    return (_SUIT[prev] != 0) | (_RANK_VALUE[curr] > _RANK_VALUE[prev])
+
+def _black_after_even(prev, curr):
+    return _ODD[prev] | ~_RED[curr]
+
+def _no_consecutive_faces(prev, curr):
+    return ~(_FACE[prev] & _FACE[curr])
+
+
+# NumPy implementations of the built-in rules, keyed by the rules.py function
+VECTOR_RULES: Dict[Callable[[List[Card]], bool], Callable[[np.ndarray, np.ndarray], np.ndarray]] = {
+    rules.alternate_colors: _alternate_colors,
+    rules.same_suit_or_rank: _same_suit_or_rank,
+    rules.odd_even_alternating: _odd_even_alternating,
+    rules.red_after_face: _red_after_face,
+    rules.sum_under_15: _sum_under_15,
+    rules.same_color_as_prev_suit: _same_color_as_prev_suit,
+    rules.higher_after_hearts: _higher_after_hearts,
+    rules.black_after_even: _black_after_even,
+    rules.no_consecutive_faces: _no_consecutive_faces,
+}
+
+
+def evaluate(rule: Callable[[List[Card]], bool], windows: np.ndarray) -> np.ndarray:
+    """
+    Evaluate a rule on a batch of card windows
+    :param rule: A rule from rules.RULES, or any rule over a list of cards
+    :param windows: (N, k) array of card codes, oldest first, left-padded with NO_CARD
+    :return: (N,) boolean mask of the windows accepted by the rule
+    """
+    windows = np.asarray(windows)
+    if windows.ndim != 2:
+        raise ValueError("Windows must be a (N, k) array of card codes")
+    if windows.shape[1] < 2:
+        return np.ones(len(windows), dtype=bool)
+
+    vector_rule = VECTOR_RULES.get(rule)
+    if vector_rule is None:
+        # Unknown rule: fall back to calling it on each decoded window
+        return np.fromiter(
+            (rule([Card.from_code(code) for code in window if code != NO_CARD]) for window in windows.tolist()),
+            dtype=bool, count=len(windows),
+        )
+
+    prev, curr = windows[:, -2], windows[:, -1]
+    return vector_rule(prev, curr) | (prev == NO_CARD)
+
+
+def evaluate_all(windows: np.ndarray) -> np.ndarray:
+    """Return a (len(RULES), N) boolean mask, one row per rule in rules.RULES"""
+    return np.stack([evaluate(rule, windows) for rule, _ in rules.RULES])
+
+
+if __name__ == "__main__":
+    transitions = all_transitions()
+    for (rule, description), mask in zip(rules.RULES, evaluate_all(transitions)):
+        print(f"{mask.mean():.3f}  {description}")